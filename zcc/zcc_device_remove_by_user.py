@@ -1,28 +1,71 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# orjson decodes faster than the stdlib json module; it's optional and we fall back when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # --- Configuration ---
 # Configure basic logging to see the script's actions
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
 log = logging.getLogger("ZCC_TEST_SCRIPT")
 
+# Removals are network-bound, so bulk runs overlap them across worker threads.
+# Keep this at or below the session's pool_maxsize so every worker gets a pooled connection.
+BULK_MAX_WORKERS = 8
+
+# (connect, read) timeout in seconds, so a stalled ZCC API can't hang the script
+REQUEST_TIMEOUT = (3, 30)
+
 # --- Core API Functions ---
 
-def get_zcc_token(base_url, client_id, client_secret):
+def build_session():
+    """
+    Creates a requests.Session shared by every API call so the TCP/TLS
+    connection to the ZCC portal is kept alive and reused between requests.
+    Transient failures (429/5xx) are retried with backoff; POST is opted in
+    explicitly because urllib3 does not retry it by default.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries))
+    session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+    return session
+
+def fast_json(response):
+    """
+    Decodes a JSON response body, using orjson when it is installed.
+    Raises a ValueError subclass if the body isn't valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def get_zcc_token(session, base_url, client_id, client_secret):
     """
     Authenticates to the ZCC API and returns a JWT token.
     Uses the same logic as your main script.
     """
     auth_url = f"{base_url}/papi/auth/v1/login"
     payload = {"apiKey": client_id, "secretKey": client_secret}
-    headers = {"Content-Type": "application/json", "Accept": "application/json"}
     log.info(f"Requesting JWT token from: {auth_url}")
     try:
-        response = requests.post(auth_url, headers=headers, json=payload)
+        response = session.post(auth_url, json=payload, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-        jwt_token = response.json().get("jwtToken")
+        jwt_token = fast_json(response).get("jwtToken")
         if not jwt_token:
             raise ValueError("Authentication successful, but no jwtToken in response.")
         log.info("✅ JWT Token retrieved successfully.")
@@ -34,33 +77,66 @@ def get_zcc_token(base_url, client_id, client_secret):
         log.error(f"❌ Authentication failed: {e}")
         return None
 
-def test_removal_endpoint(base_url, token, endpoint_path, username):
+def test_removal_endpoint(session, base_url, token, endpoint_path, username):
     """
     Sends a POST request to a specified removal endpoint for a given username.
     This function is will print the raw API response.
+    Returns True when the API answered with a 2xx status code.
     """
     removal_url = f"{base_url}{endpoint_path}"
-    headers = {"Content-Type": "application/json", "auth-token": token}
+    headers = {"auth-token": token}
     payload = {"userName": username}
 
     log.info(f"Sending POST to: {removal_url}")
     log.info(f"Payload: {payload}")
 
     try:
-        response = requests.post(removal_url, headers=headers, json=payload)
-        
-        # We print the results regardless of status code for analysis
-        print("-" * 50)
-        print(f">>> Status Code: {response.status_code}")
+        response = session.post(removal_url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
+
+        # We print the results regardless of status code for analysis.
+        # The block is printed in one call so output from bulk worker threads doesn't interleave.
+        lines = ["-" * 50, f">>> Username: {username}", f">>> Status Code: {response.status_code}"]
         try:
             # Try to print JSON, but fall back to raw text if it fails
-            print(f">>> Response JSON: {response.json()}")
-        except requests.exceptions.JSONDecodeError:
-            print(f">>> Response Text: {response.text}")
-        print("-" * 50)
+            lines.append(f">>> Response JSON: {fast_json(response)}")
+        except ValueError:
+            lines.append(f">>> Response Text: {response.text}")
+        lines.append("-" * 50)
+        print("\n".join(lines))
+        return response.ok
 
     except requests.exceptions.RequestException as e:
-        log.error(f"❌ An error occurred during the API call: {e}")
+        log.error(f"❌ An error occurred during the API call for '{username}': {e}")
+        return False
+
+def load_usernames(source):
+    """
+    Returns the usernames for a bulk run.
+    `source` is either a path to a file with one username per line, or a comma-separated list of usernames.
+    Blank entries and duplicates are dropped while keeping the original order.
+    """
+    if os.path.isfile(source):
+        with open(source, "r") as f:
+            entries = [line.strip() for line in f]
+    else:
+        entries = [entry.strip() for entry in source.split(",")]
+    return list(dict.fromkeys(entry for entry in entries if entry))
+
+def bulk_removal(session, base_url, token, endpoint_path, usernames):
+    """
+    Runs test_removal_endpoint for every username concurrently and logs a summary once all calls finish.
+    """
+    log.info(f"Submitting {len(usernames)} removal request(s) with up to {BULK_MAX_WORKERS} workers...")
+    succeeded = 0
+    with ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(test_removal_endpoint, session, base_url, token, endpoint_path, username)
+            for username in usernames
+        ]
+        for future in as_completed(futures):
+            if future.result():
+                succeeded += 1
+    log.info(f"Bulk removal finished: {succeeded} succeeded, {len(usernames) - succeeded} failed.")
 
 # --- Main Interactive Execution Block ---
 
@@ -83,8 +159,11 @@ def main():
         else:
             base_url = override_url.strip('/')
 
+        # One session for the whole run so every call reuses the same connection
+        session = build_session()
+
         # Authenticate once at the beginning
-        token = get_zcc_token(base_url, client_id, client_secret)
+        token = get_zcc_token(session, base_url, client_id, client_secret)
         if not token:
             log.error("Could not authenticate. Please check your credentials and API connectivity. Exiting.")
             return
@@ -94,14 +173,31 @@ def main():
             print("\nSelect the endpoint to test:")
             print("  1. Soft Remove (/papi/public/v1/removeDevices)")
             print("  2. Force Remove (/papi/public/v1/forceRemoveDevices)")
-            print("  3. Exit")
-            
-            choice = input("Enter your choice (1, 2, or 3): ").strip()
+            print("  3. Bulk remove from file (or comma-separated list)")
+            print("  4. Exit")
 
-            if choice == '3':
+            choice = input("Enter your choice (1, 2, 3, or 4): ").strip()
+
+            if choice == '4':
                 log.info("Exiting the script.")
                 break
-            
+
+            if choice == '3':
+                removal_type = input("Select the removal type for the bulk run (1 = Soft, 2 = Force): ").strip()
+                if removal_type not in ['1', '2']:
+                    log.warning("Invalid removal type. Please try again.")
+                    continue
+                endpoint_path = "/papi/public/v1/removeDevices" if removal_type == '1' else "/papi/public/v1/forceRemoveDevices"
+
+                source = input("Enter a file path (one username per line) or a comma-separated list of usernames: ").strip()
+                usernames = load_usernames(source)
+                if not usernames:
+                    log.warning("No usernames found.")
+                    continue
+
+                bulk_removal(session, base_url, token, endpoint_path, usernames)
+                continue
+
             if choice not in ['1', '2']:
                 log.warning("Invalid choice. Please try again.")
                 continue
@@ -116,7 +212,7 @@ def main():
                 continue
 
             # Call the test function
-            test_removal_endpoint(base_url, token, endpoint_path, username_to_test)
+            test_removal_endpoint(session, base_url, token, endpoint_path, username_to_test)
 
     except Exception as e:
         log.error(f"❌ An unrecoverable error occurred: {e}", exc_info=False)
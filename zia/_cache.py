@@ -0,0 +1,59 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+# Shared on-disk cache for read-only ZIA API responses, so back-to-back script runs
+# don't re-download data that only changes every few minutes.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "zscaler_scripts")
+
+# URL categories rarely change between consecutive runs of the analysis scripts.
+CATEGORIES_TTL_S = 60
+
+
+def _cache_path(key):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.pkl")
+
+
+def cached(key, ttl_s, loader, enabled=True):
+    """
+    Returns the value cached under `key` if it is younger than `ttl_s` seconds,
+    otherwise calls `loader()` and writes its result through to the cache.
+
+    Args:
+        key (str): Cache key. Include the cloud and user so tenants never share entries.
+        ttl_s (int): Maximum age of a cached entry, in seconds.
+        loader (callable): Zero-argument function that fetches the fresh value.
+        enabled (bool): When False the cache is bypassed and `loader()` is always called.
+
+    Returns:
+        The cached or freshly loaded value.
+    """
+    if not enabled:
+        return loader()
+
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+        if time.time() - entry["ts"] < ttl_s:
+            return pickle.loads(entry["body"])
+    except Exception:
+        # Missing, expired or unreadable entries are simply refetched.
+        pass
+
+    value = loader()
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        entry = {"ts": time.time(), "body": pickle.dumps(value)}
+        # Write to a temp file first so a concurrent run never reads a half-written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Caching is best-effort; the fresh value is still returned.
+        pass
+    return value
@@ -0,0 +1,67 @@
+import os
+import sys
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from dotenv import load_dotenv
+
+# Environment variables every ZIA script needs, keyed by their LegacyZIAClient config name.
+REQUIRED_ENV = {
+    "username": "ZIA_USERNAME",     # ZIA admin username
+    "password": "ZIA_PASSWORD",     # ZIA admin password
+    "api_key": "ZIA_API_KEY",       # ZIA API key
+    "cloud": "ZIA_CLOUD",           # ZIA cloud environment
+}
+
+
+def env_bool(key, default=False):
+    """
+    Reads a boolean flag from the environment; "1", "true" and "yes" (any case) count as True.
+
+    Args:
+        key (str): Name of the environment variable.
+        default (bool): Value used when the variable is not set.
+
+    Returns:
+        bool: The parsed flag.
+    """
+    return os.environ.get(key, str(default)).strip().lower() in ("1", "true", "yes")
+
+
+def configure_logging():
+    """
+    Sets up "[LEVEL] message" logging the way the scripts used to print: INFO records go to stdout
+    with the tables and prompts, WARNING and above go to stderr.
+    """
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.addFilter(lambda record: record.levelno < logging.WARNING)
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setLevel(logging.WARNING)
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s", handlers=[stdout_handler, stderr_handler])
+
+
+@lru_cache(maxsize=1)
+def get_zia_config():
+    """
+    Loads the .env file once and returns the LegacyZIAClient configuration.
+    Exits with an error if any required environment variable is missing.
+
+    Returns:
+        MappingProxyType: Read-only view of the configuration, shared by every caller.
+    """
+    load_dotenv()
+
+    # Read each required variable once, then collect the missing ones from the same dict
+    env = {env_var: os.environ.get(env_var) for env_var in REQUIRED_ENV.values()}
+    missing_vars = [env_var for env_var, value in env.items() if not value]
+    if missing_vars:
+        print(f"[ERROR] Missing required environment variables: {', '.join(missing_vars)}", file=sys.stderr)
+        print("Please check your .env file and run the script again.", file=sys.stderr)
+        sys.exit(1)
+
+    config = {key: env[env_var] for key, env_var in REQUIRED_ENV.items()}
+    config["logging"] = {
+        "enabled": env_bool("ZIA_LOG_ENABLED"),
+        "verbose": env_bool("ZIA_LOG_VERBOSE"),
+    }
+    return MappingProxyType(config)
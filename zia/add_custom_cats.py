@@ -1,24 +1,14 @@
 import os
 import sys
-from dotenv import load_dotenv
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config
 
 def main():
     """
     Main function to bulk-upload URLs to a ZIA custom category.
     """
-    load_dotenv()
-
-    config = {
-        "username": os.getenv("ZIA_USERNAME"),
-        "password": os.getenv("ZIA_PASSWORD"),
-        "api_key": os.getenv("ZIA_API_KEY"),
-        "cloud": os.getenv("ZIA_CLOUD"),
-    }
-    
-    if not all(config.values()):
-        print("Error: Missing one or more required environment variables (ZIA_USERNAME, ZIA_PASSWORD, ZIA_API_KEY, ZIA_CLOUD).", file=sys.stderr)
-        sys.exit(1)
+    # Load and validate the shared ZIA configuration from the .env file
+    config = get_zia_config()
 
     # This line is important. There is no where in the web UI to see the category_id value. From my research
     # it only returns when pulling custom categories. You should be sure to document which category maps to which list.
@@ -30,10 +20,13 @@ def main():
     # The table should show a cat ID and the name of the URL list for example 1. [CUSTOM_02 | Malware_C2_URLs]. That table is then used as a
     # selection menu for the user which determines which list to update. 
 
-
+    # Check the input file before signing in, so a bad path doesn't cost a ZIA login round-trip
+    if not os.path.isfile(urls_file):
+        print(f"Error: The file '{urls_file}' was not found.", file=sys.stderr)
+        sys.exit(1)
 
     try:
-        with LegacyZIAClient(config) as client:
+        with LegacyZIAClient(dict(config)) as client:
             print("Successfully authenticated with ZIA.")
 
             # --- 1. Fetch the target category ---
@@ -44,27 +37,40 @@ def main():
                 sys.exit(1)
 
             existing_urls = set(category.urls)
-            print(f"Found {len(existing_urls)} URLs currently in '{category.configured_name}'.")
+            print(f"Found {len(category.urls)} URLs currently in '{category.configured_name}'.")
 
             # --- 2. Read new URLs from file ---
+            # The file is streamed and checked against the category as it is read, so only
+            # URLs that are actually new are kept in memory (in file order, without duplicates).
             print(f"Reading URLs to add from '{urls_file}'...")
+            urls_read = 0
+            new_urls_to_add = []
+            seen_urls = set()
             try:
                 with open(urls_file, "r") as f:
-                    urls_to_add = {line.strip() for line in f if line.strip()}
+                    for line in f:
+                        url = line.strip()
+                        if not url:
+                            continue
+                        urls_read += 1
+                        if url not in existing_urls and url not in seen_urls:
+                            seen_urls.add(url)
+                            new_urls_to_add.append(url)
             except FileNotFoundError:
                 print(f"Error: The file '{urls_file}' was not found.", file=sys.stderr)
                 sys.exit(1)
 
-            print(f"Found {len(urls_to_add)} unique URLs in the file.")
-            
+            print(f"Read {urls_read} URLs from the file.")
+
             # --- 3. Combine and Update URL List ---
-            new_urls_to_add = urls_to_add - existing_urls
+            # Keep the category's current order and append only the novel URLs,
+            # so the payload is stable between runs and no union set has to be built.
             if not new_urls_to_add:
                 print("\nNo new URLs to add. All URLs from the file already exist in the category.")
                 sys.exit(0)
 
             print(f"Adding {len(new_urls_to_add)} new, unique URLs to the category.")
-            combined_urls = list(existing_urls.union(new_urls_to_add))
+            combined_urls = category.urls + new_urls_to_add
 
             # ======================================================================
             # THE FIX IS HERE:
@@ -1,54 +1,44 @@
 #!/usr/bin/env python
 
-from dotenv import load_dotenv
-import os
 import sys
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config
+from _cache import cached, CATEGORIES_TTL_S
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Configuration for Legacy ZIA Client
-config = {
-    "username": os.getenv("ZIA_USERNAME"),      # ZIA admin username
-    "password": os.getenv("ZIA_PASSWORD"),      # ZIA admin password
-    "api_key": os.getenv("ZIA_API_KEY"),        # ZIA API key
-    "cloud": os.getenv("ZIA_CLOUD"),            # ZIA cloud environment
-    "logging": {
-        "enabled": bool(os.getenv("ZIA_LOG_ENABLED", "False").lower() == "true"),
-        "verbose": bool(os.getenv("ZIA_LOG_VERBOSE", "False").lower() == "true"),
-    },
-}
-
-# Check for missing environment variables
-required_keys = ["username", "password", "api_key", "cloud"]
-missing_vars = [key for key in required_keys if not config.get(key)]
-if missing_vars:
-    print(f"[ERROR] Missing required environment variables: {', '.join(missing_vars)}")
-    print("Please check your .env file and run the script again.")
-    exit(1)
-
-def fetch_custom_categories(client):
+# Load and validate the shared ZIA configuration from the .env file
+config = get_zia_config()
+
+def fetch_custom_categories(client, use_cache=True):
     """
     Fetches all custom URL categories defined in ZIA.
 
     Args:
         client (LegacyZIAClient): Authenticated ZIA SDK client.
+        use_cache (bool): Reuse a recent on-disk copy of the categories when available.
 
     Returns:
         list: Custom URL categories with their IDs and names.
     """
-    try:
-        print("[INFO] Fetching URL categories...")
-        url_categories, _, error = client.url_categories.list_categories()
+    def load_custom_categories():
+        # customOnly makes ZIA skip the predefined categories, so only custom ones are returned
+        url_categories, _, error = client.url_categories.list_categories(query_params={"custom_only": True})
         if error:
             print(f"[ERROR] Failed to fetch URL categories: {error}")
             exit(1)
 
-        custom_categories = [
+        return [
             {"id": category.id, "name": category.configured_name}
-            for category in url_categories if category.id.startswith("CUSTOM_")
+            for category in url_categories
         ]
+
+    try:
+        print("[INFO] Fetching URL categories...")
+        cache_key = f"{config['cloud']}:{config['username']}:url_categories.custom"
+        custom_categories = cached(cache_key, CATEGORIES_TTL_S, load_custom_categories, enabled=use_cache)
         print(f"[INFO] Found {len(custom_categories)} custom categories.")
         return custom_categories
     except Exception as e:
@@ -78,6 +68,9 @@ def fetch_url_filtering_policies(client):
         print(f"[ERROR] Failed to fetch filtering policies: {e}")
         exit(1)
 
+# Pulls the policy fields used below in one C-level call instead of three getattr lookups.
+get_policy_attrs = attrgetter("name", "action", "url_categories")
+
 def map_categories_to_policies(custom_categories, filtering_policies):
     """
     Maps custom categories to the policies that use them.
@@ -89,48 +82,57 @@ def map_categories_to_policies(custom_categories, filtering_policies):
     Returns:
         list: Custom categories with detailed mapping to the policies they’re used in.
     """
-    mapped_categories = []
-    for category in custom_categories:
-        category_id = category["id"]
-        category_name = category["name"]
-
-        # Find policies that reference this category ID
-        linked_policies = []
-        for policy in filtering_policies:
+    # Index policies by the category IDs they reference in a single pass,
+    # so each category lookup below is a dict hit instead of a scan over every policy.
+    policies_by_category = defaultdict(list)
+    for policy in filtering_policies:
+        try:
+            policy_name, action, category_ids = get_policy_attrs(policy)
+        except AttributeError:
+            # Only malformed policies pay for the per-attribute fallbacks
             policy_name = getattr(policy, "name", "Unnamed Policy")
             action = getattr(policy, "action", "No Action Defined")
-            category_ids = getattr(policy, "url_categories", [])
-
-            # Check if this category ID is referenced in the policy
-            if category_id in category_ids:
-                linked_policies.append({
-                    "policy_name": policy_name,
-                    "action": action
-                })
-
-        mapped_categories.append({
-            "id": category_id,
-            "name": category_name,
-            "linked_policies": linked_policies
-        })
+            category_ids = getattr(policy, "url_categories", None)
+        category_ids = category_ids or ()
+
+        for category_id in category_ids:
+            policies_by_category[category_id].append({
+                "policy_name": policy_name,
+                "action": action
+            })
+
+    mapped_categories = [
+        {
+            "id": category["id"],
+            "name": category["name"],
+            "linked_policies": policies_by_category.get(category["id"], [])
+        }
+        for category in custom_categories
+    ]
 
     return mapped_categories
 
 def main():
+    parser = argparse.ArgumentParser(description="Analyze how custom URL categories are used across URL filtering policies.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch URL categories from ZIA instead of the local cache.")
+    args = parser.parse_args()
+
     try:
         # Authenticate using Legacy ZIA Client
-        with LegacyZIAClient(config) as parent_client:
+        with LegacyZIAClient(dict(config)) as parent_client:
             print("[INFO] Authenticating to ZIA using Python SDK...")
             print("[INFO] Authentication successful!")
 
             # Assign client to `client.zia_legacy_client`
             client = parent_client.zia_legacy_client
 
-            # Step 1: Fetch custom URL categories
-            custom_categories = fetch_custom_categories(client)
-
-            # Step 2: Fetch URL filtering policies
-            filtering_policies = fetch_url_filtering_policies(client)
+            # Step 1 & 2: Fetch custom URL categories and URL filtering policies.
+            # The two calls are independent, so they run side by side to overlap their API round-trips.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                categories_future = executor.submit(fetch_custom_categories, client, not args.no_cache)
+                policies_future = executor.submit(fetch_url_filtering_policies, client)
+                custom_categories = categories_future.result()
+                filtering_policies = policies_future.result()
 
             # Step 3: Map categories to policies
             mapped_categories = map_categories_to_policies(custom_categories, filtering_policies)
@@ -1,55 +1,37 @@
 #!/usr/bin/env python
 
-from dotenv import load_dotenv
-import os
+import argparse
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config
+from _cache import cached, CATEGORIES_TTL_S
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Read configuration details from environment variables
-config = {
-    "username": os.getenv("ZIA_USERNAME"),      # ZIA admin username
-    "password": os.getenv("ZIA_PASSWORD"),      # ZIA admin password
-    "api_key": os.getenv("ZIA_API_KEY"),        # ZIA API key
-    "cloud": os.getenv("ZIA_CLOUD"),            # ZIA cloud environment
-    "logging": {
-        "enabled": bool(os.getenv("ZIA_LOG_ENABLED", "False").lower() == "true"),
-        "verbose": bool(os.getenv("ZIA_LOG_VERBOSE", "False").lower() == "true"),
-    },
-}
-
-# Validate environment variables
-required_keys = ["username", "password", "api_key", "cloud"]
-missing_vars = [key for key in required_keys if not config.get(key)]
-if missing_vars:
-    print(f"Error: Missing required environment variables: {', '.join(missing_vars)}")
-    print("Please check your .env file and run the script again.")
-    exit(1)
+# Load and validate the shared ZIA configuration from the .env file
+config = get_zia_config()
 
 # Function to fetch custom categories
-def fetch_custom_url_categories(client):
+def fetch_custom_url_categories(client, use_cache=True):
     """
-    Fetches all URL categories and filters for custom categories.
+    Fetches the custom URL categories, letting ZIA filter them server-side.
 
     Args:
         client (LegacyZIAClient): Authenticated ZIA client.
+        use_cache (bool): Reuse a recent on-disk copy of the categories when available.
 
     Returns:
         list: List of custom categories with their details.
     """
-    url_categories, _, error = client.zia_legacy_client.url_categories.list_categories()
-    if error:
-        print(f"Error fetching URL categories: {error}")
-        exit(1)
-
-    # Loop through categories and filter custom ones using attribute access
-    custom_categories = []
-    for category in url_categories:
-        if category.custom_category:  # Access the 'custom_category' attribute directly
-            custom_categories.append(category)
-
-    return custom_categories
+    def load_custom_categories():
+        # customOnly makes ZIA skip the predefined categories, so only custom ones are returned
+        custom_categories, _, error = client.zia_legacy_client.url_categories.list_categories(
+            query_params={"custom_only": True}
+        )
+        if error:
+            print(f"Error fetching URL categories: {error}")
+            exit(1)
+        return custom_categories
+
+    cache_key = f"{config['cloud']}:{config['username']}:url_categories.custom_objects"
+    return cached(cache_key, CATEGORIES_TTL_S, load_custom_categories, enabled=use_cache)
 
 # Function to summarize categories
 def summarize_custom_categories(custom_categories):
@@ -74,14 +56,18 @@ def summarize_custom_categories(custom_categories):
 
 # Main workflow
 def main():
+    parser = argparse.ArgumentParser(description="Summarize custom URL categories and their URL counts.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch URL categories from ZIA instead of the local cache.")
+    args = parser.parse_args()
+
     try:
         # Step 1: Authenticate using the context manager
-        with LegacyZIAClient(config) as client:
+        with LegacyZIAClient(dict(config)) as client:
             print("Authenticating with the ZIA Python SDK API...")
             print("Authentication successful!")
 
             # Step 2: Fetch custom URL categories
-            custom_categories = fetch_custom_url_categories(client)
+            custom_categories = fetch_custom_url_categories(client, not args.no_cache)
 
             # Step 3: Summarize data
             summary = summarize_custom_categories(custom_categories)
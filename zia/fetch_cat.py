@@ -1,32 +1,18 @@
 #!/usr/bin/env python
 
-from dotenv import load_dotenv
-import os
 import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config
+from _cache import cached, CATEGORIES_TTL_S
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Configuration for Legacy ZIA Client
-config = {
-    "username": os.getenv("ZIA_USERNAME"),      # ZIA admin username
-    "password": os.getenv("ZIA_PASSWORD"),      # ZIA admin password
-    "api_key": os.getenv("ZIA_API_KEY"),        # ZIA API key
-    "cloud": os.getenv("ZIA_CLOUD"),            # ZIA cloud environment
-    "logging": {
-        "enabled": bool(os.getenv("ZIA_LOG_ENABLED", "False").lower() == "true"),
-        "verbose": bool(os.getenv("ZIA_LOG_VERBOSE", "False").lower() == "true"),
-    },
-}
-
-# Check for missing environment variables
-required_keys = ["username", "password", "api_key", "cloud"]
-missing_vars = [key for key in required_keys if not config.get(key)]
-if missing_vars:
-    print(f"[ERROR] Missing required environment variables: {', '.join(missing_vars)}")
-    print("Please check your .env file and run the script again.")
-    exit(1)
+# Load and validate the shared ZIA configuration from the .env file
+config = get_zia_config()
+
+# ID prefixes that mark user-defined URL categories (str.startswith takes the whole tuple)
+_CUSTOM_PREFIXES = ("CUSTOM_",)
 
 def fetch_url_filtering_policies(client):
     """
@@ -51,30 +37,38 @@ def fetch_url_filtering_policies(client):
         print(f"[ERROR] Failed to fetch URL filtering policies: {e}")
         exit(1)
 
-def fetch_url_categories(client):
+def fetch_url_categories(client, use_cache=True):
     """
     Fetches all URL categories using client.url_categories.list_categories().
 
     Args:
         client (LegacyZIAClient): Authenticated ZIA SDK client.
+        use_cache (bool): Reuse a recent on-disk copy of the categories when available.
 
     Returns:
         dict: Dictionary mapping category IDs to names.
     """
-    try:
-        print("[INFO] Fetching URL categories...")
+    def load_category_map():
         url_categories, _, error = client.url_categories.list_categories()
         if error:
             print(f"[ERROR] Failed to fetch URL categories: {error}")
             exit(1)
 
-        category_map = {category.id: category.configured_name for category in url_categories}
+        return {category.id: category.configured_name for category in url_categories}
+
+    try:
+        print("[INFO] Fetching URL categories...")
+        cache_key = f"{config['cloud']}:{config['username']}:url_categories.id_to_name"
+        category_map = cached(cache_key, CATEGORIES_TTL_S, load_category_map, enabled=use_cache)
         print(f"[INFO] Found {len(category_map)} URL categories.")
         return category_map # gets used in next function
     except Exception as e:
         print(f"[ERROR] Failed to fetch URL categories: {e}")
         exit(1)
 
+# Pulls the policy fields used below in one C-level call instead of three getattr lookups.
+get_policy_attrs = attrgetter("name", "action", "url_categories")
+
 def identify_policies_using_custom_categories(filtering_policies, category_map):
     """
     Identifies policies that reference custom categories and maps IDs to names.
@@ -83,58 +77,72 @@ def identify_policies_using_custom_categories(filtering_policies, category_map):
         filtering_policies (list): List of URL filtering policies.
         category_map (dict): Dictionary mapping category IDs to names.
 
-    Returns:
-        list: Policies referencing custom categories, including ID-to-name mapping.
+    Yields:
+        dict: Each policy referencing custom categories, including ID-to-name mapping,
+        as soon as it is found so callers can process matches in a single pass.
     """
-    matching_policies = []
-    for policy in filtering_policies:
-        # Access attributes directly instead of using `.get()`
-        policy_name = getattr(policy, "name", "Unnamed Policy")
-        action = getattr(policy, "action", "No Action Defined")
+    # Resolve the known custom IDs and their names once, so most IDs are settled by a hash lookup.
+    # A custom ID missing from the (possibly cached) listing still passes the prefix test and is reported as "Unknown".
+    custom_names = {cat_id: name for cat_id, name in category_map.items() if cat_id.startswith(_CUSTOM_PREFIXES)}
 
-        # Extract referenced categories from the 'url_categories' attribute
-        category_ids = getattr(policy, "url_categories", [])
+    for policy in filtering_policies:
+        # Access attributes directly instead of using `.get()`, extracting the
+        # referenced categories from the 'url_categories' attribute
+        try:
+            policy_name, action, category_ids = get_policy_attrs(policy)
+        except AttributeError:
+            # Only malformed policies pay for the per-attribute fallbacks
+            policy_name = getattr(policy, "name", "Unnamed Policy")
+            action = getattr(policy, "action", "No Action Defined")
+            category_ids = getattr(policy, "url_categories", None)
+        category_ids = category_ids or ()
 
         # Check if category IDs match "CUSTOM_" and map to names
         custom_categories_in_policy = [
-            {"id": cat_id, "name": category_map.get(cat_id, "Unknown")}
-            for cat_id in category_ids if cat_id.startswith("CUSTOM_") #This came from POSTMAN Analysis work
+            {"id": cat_id, "name": custom_names.get(cat_id, "Unknown")}
+            for cat_id in category_ids
+            if cat_id in custom_names or cat_id.startswith(_CUSTOM_PREFIXES) #This came from POSTMAN Analysis work
         ]
 
         if custom_categories_in_policy:  # If custom categories are found in this policy
-            matching_policies.append({
+            yield {
                 "name": policy_name,
                 "action": action,
                 "custom_categories": custom_categories_in_policy
-            })
-
-    print(f"[INFO] Found {len(matching_policies)} policies referencing custom categories.")
-    return matching_policies
+            }
 
 def main():
+    parser = argparse.ArgumentParser(description="Identify URL filtering policies that reference custom URL categories.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch URL categories from ZIA instead of the local cache.")
+    args = parser.parse_args()
+
     try:
         # Step 1: Authenticate using Legacy ZIA Client context manager
-        with LegacyZIAClient(config) as parent_client:
+        with LegacyZIAClient(dict(config)) as parent_client:
             print("[INFO] Authenticating to ZIA using Python SDK...")
             print("[INFO] Authentication successful!")
 
             # Assign client to `client.zia_legacy_client`
             client = parent_client.zia_legacy_client
 
-            # Fetch URL filtering policies and categories
-            filtering_policies = fetch_url_filtering_policies(client)
-            category_map = fetch_url_categories(client)
-
-            # Identify policies referencing custom categories
-            matched_policies = identify_policies_using_custom_categories(filtering_policies, category_map)
+            # Fetch URL filtering policies and categories.
+            # The two calls are independent, so they run side by side to overlap their API round-trips.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                policies_future = executor.submit(fetch_url_filtering_policies, client)
+                categories_future = executor.submit(fetch_url_categories, client, not args.no_cache)
+                filtering_policies = policies_future.result()
+                category_map = categories_future.result()
 
-            # Display matched policies
+            # Identify and display policies referencing custom categories in one streaming pass
             print("\nPolicies Referencing CUSTOM_ Categories:\n", "-" * 50)
-            for policy in matched_policies:
+            matched_count = 0
+            for policy in identify_policies_using_custom_categories(filtering_policies, category_map):
+                matched_count += 1
                 print(f"- Name: {policy['name']} | Action: {policy['action']}")
                 for category in policy['custom_categories']:
                     print(f"    -> Category ID: {category['id']} | Name: {category['name']}")
             print("-" * 50)
+            print(f"[INFO] Found {matched_count} policies referencing custom categories.")
 
     except Exception as e:
         print(f"[ERROR] An exception occurred during execution: {e}")
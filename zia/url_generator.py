@@ -1,7 +1,7 @@
 import random
+import argparse
 
 # --- Configuration ---
-NUM_URLS_TO_GENERATE = int(input("How many URLs do you want to generate?\n> "))
 OUTPUT_FILENAME = "sample_urls.txt"
 
 # --- Word lists to create realistic domains ---
@@ -34,29 +34,60 @@ NOUNS = [
 
 TLDS = ["com", "net", "org", "io", "co", "ai", "tech", "cloud", "app"]
 
+# Oversampling factor for each batch, so most batches cover the collisions they produce.
+OVERSAMPLE = 1.3
+
 def generate_unique_urls(count):
     """Generates a set of unique URLs."""
+    num_nouns, num_tlds = len(NOUNS), len(TLDS)
+    max_unique = len(ADJECTIVES) * num_nouns * num_tlds
+    if count > max_unique:
+        print(f"Only {max_unique} unique URLs can be built from the word lists; generating {max_unique}.")
+        count = max_unique
+
     print(f"Generating {count} unique URLs...")
-    generated_urls = set()
+    # Every adjective/noun/TLD combination has a flat index; one bit per index marks
+    # the URLs already emitted, so dedupe needs a few kB instead of a set of strings.
+    seen = bytearray((max_unique + 7) // 8)
+    all_indices = range(max_unique)
+    generated_urls = []
     while len(generated_urls) < count:
-        adj = random.choice(ADJECTIVES)
-        noun = random.choice(NOUNS)
-        tld = random.choice(TLDS)
-        # Combine them into a domain format
-        url = f"{adj}-{noun}.{tld}"
-        generated_urls.add(url)
-    return list(generated_urls)
+        # Draw a whole batch of candidate indices at once instead of three random.choice calls per URL
+        batch = int((count - len(generated_urls)) * OVERSAMPLE) + 1
+        for index in random.choices(all_indices, k=batch):
+            byte, bit = index >> 3, 1 << (index & 7)
+            if seen[byte] & bit:
+                continue
+            seen[byte] |= bit
+            # Only build the string once the index is known to be new
+            adj_noun, tld = divmod(index, num_tlds)
+            adj, noun = divmod(adj_noun, num_nouns)
+            # Combine them into a domain format
+            generated_urls.append(f"{ADJECTIVES[adj]}-{NOUNS[noun]}.{TLDS[tld]}")
+            if len(generated_urls) == count:
+                break
+    return generated_urls
 
 def save_urls_to_file(urls, filename):
     """Saves a list of URLs to a text file, one per line."""
     print(f"Writing {len(urls)} URLs to '{filename}'...")
-    # Sort the list alphabetically for a clean output file
-    urls.sort()
-    with open(filename, "w") as f:
-        for url in urls:
-            f.write(f"{url}\n")
+    # Sort alphabetically for a clean output file and write it in one buffered call
+    with open(filename, "w", buffering=1 << 20) as f:
+        if urls:
+            f.write("\n".join(sorted(urls)))
+            f.write("\n")
     print("Done!")
 
+def main(args):
+    # Fall back to the interactive prompt when --count isn't given
+    count = args.count
+    if count is None:
+        count = int(input("How many URLs do you want to generate?\n> "))
+    unique_urls = generate_unique_urls(count)
+    save_urls_to_file(unique_urls, args.output)
+
 if __name__ == "__main__":
-    unique_urls = generate_unique_urls(NUM_URLS_TO_GENERATE)
-    save_urls_to_file(unique_urls, OUTPUT_FILENAME)
+    parser = argparse.ArgumentParser(description="Generate a file of unique sample domains for testing.")
+    parser.add_argument("-n", "--count", type=int, help="Number of URLs to generate (prompted for if omitted).")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILENAME, help="Path to the output file.")
+    main(parser.parse_args())
@@ -1,33 +1,19 @@
 #!/usr/bin/env python
 
-from dotenv import load_dotenv
-import os
-import sys
+import logging
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config, configure_logging
 
+# Status messages go through logging, which buffers and locks once per record
+# instead of once per print() call; tables and prompts are still printed.
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
+# Load and validate the shared ZIA configuration from the .env file
+config = get_zia_config()
 
-# Configuration for Legacy ZIA Client
-config = {
-    "username": os.getenv("ZIA_USERNAME"),      # ZIA admin username
-    "password": os.getenv("ZIA_PASSWORD"),      # ZIA admin password
-    "api_key": os.getenv("ZIA_API_KEY"),        # ZIA API key
-    "cloud": os.getenv("ZIA_CLOUD"),            # ZIA cloud environment
-    "logging": {
-        "enabled": bool(os.getenv("ZIA_LOG_ENABLED", "False").lower() == "true"),
-        "verbose": bool(os.getenv("ZIA_LOG_VERBOSE", "False").lower() == "true"),
-    },
-}
-
-# Check for missing environment variables
-required_keys = ["username", "password", "api_key", "cloud"]
-missing_vars = [key for key in required_keys if not config.get(key)]
-if missing_vars:
-    print(f"[ERROR] Missing required environment variables: {', '.join(missing_vars)}")
-    print("Please check your .env file and run the script again.")
-    exit(1)
+# ID prefixes that mark user-defined URL categories (str.startswith takes the whole tuple)
+_CUSTOM_PREFIXES = ("CUSTOM_",)
 
 
 def fetch_custom_categories(client):
@@ -38,23 +24,24 @@ def fetch_custom_categories(client):
         client (LegacyZIAClient): Authenticated ZIA SDK client.
 
     Returns:
-        list: List of custom categories with their names and IDs.
+        list: List of custom categories with their names, IDs and the full category object
+            (which already carries the URLs and super category needed for an update).
     """
     try:
-        print("[INFO] Fetching custom URL categories...")
+        logger.info("Fetching custom URL categories...")
         url_categories, _, error = client.url_categories.list_categories()
         if error:
-            print(f"[ERROR] Failed to fetch URL categories: {error}")
+            logger.error(f"Failed to fetch URL categories: {error}")
             exit(1)
 
         custom_categories = [
-            {"id": category.id, "name": category.configured_name}
-            for category in url_categories if category.id.startswith("CUSTOM_")
+            {"id": category.id, "name": category.configured_name, "category": category}
+            for category in url_categories if category.id.startswith(_CUSTOM_PREFIXES)
         ]
-        print(f"[INFO] Found {len(custom_categories)} custom categories.")
+        logger.info(f"Found {len(custom_categories)} custom categories.")
         return custom_categories
     except Exception as e:
-        print(f"[ERROR] Failed to fetch custom categories: {e}")
+        logger.error(f"Failed to fetch custom categories: {e}")
         exit(1)
 
 
@@ -69,16 +56,16 @@ def fetch_url_filtering_policies(client):
         list: List of policies with URL categories used.
     """
     try:
-        print("[INFO] Fetching URL filtering policies...")
+        logger.info("Fetching URL filtering policies...")
         filtering_policies, _, error = client.url_filtering.list_rules()
         if error:
-            print(f"[ERROR] Failed to fetch URL filtering policies: {error}")
+            logger.error(f"Failed to fetch URL filtering policies: {error}")
             exit(1)
 
-        print(f"[INFO] Found {len(filtering_policies)} filtering policies.")
+        logger.info(f"Found {len(filtering_policies)} filtering policies.")
         return filtering_policies
     except Exception as e:
-        print(f"[ERROR] Failed to fetch filtering policies: {e}")
+        logger.error(f"Failed to fetch filtering policies: {e}")
         exit(1)
 
 
@@ -93,67 +80,76 @@ def analyze_category_usage(custom_categories, filtering_policies):
     Returns:
         dict: Contains mapped custom categories to referenced policies, along with unused categories.
     """
-    used_category_ids = set()
-
-    # Map policies to categories
+    # Map each custom category ID to the policies referencing it, in a single pass over the policies
+    cat_to_policies = {}
     for policy in filtering_policies:
-        category_ids = getattr(policy, "url_categories", [])
+        category_ids = getattr(policy, "url_categories", None) or ()
         for category_id in category_ids:
-            if category_id.startswith("CUSTOM_"):
-                used_category_ids.add(category_id)
+            if category_id.startswith(_CUSTOM_PREFIXES):
+                cat_to_policies.setdefault(category_id, []).append({
+                    "policy_name": getattr(policy, "name", "Unnamed Policy"),
+                    "action": getattr(policy, "action", "No Action Defined")
+                })
+
+    # Index the custom categories by ID once, then split them into used and unused IDs
+    # with set operations on the dict key views (sorted so the report order is stable)
+    cats_by_id = {cat["id"]: cat["name"] for cat in custom_categories}
+    used_ids = cats_by_id.keys() & cat_to_policies.keys()
+    unused_ids = cats_by_id.keys() - used_ids
 
-    # Separate categories into used and unused
     used_categories = [
-        {"id": cat["id"], "name": cat["name"], "linked_policies": []}
-        for cat in custom_categories if cat["id"] in used_category_ids
-    ]
-
-    unused_categories = [
-        {"id": cat["id"], "name": cat["name"]}
-        for cat in custom_categories if cat["id"] not in used_category_ids
+        {"id": cat_id, "name": cats_by_id[cat_id], "linked_policies": cat_to_policies[cat_id]}
+        for cat_id in sorted(used_ids)
     ]
-
-    # Map policies to their referenced categories
-    for cat in used_categories:
-        for policy in filtering_policies:
-            category_ids = getattr(policy, "url_categories", [])
-            if cat["id"] in category_ids:
-                linked_policies = getattr(policy, "name", "Unnamed Policy")
-                action = getattr(policy, "action", "No Action Defined")
-                cat["linked_policies"].append({"policy_name": linked_policies, "action": action})
+    unused_categories = [{"id": cat_id, "name": cats_by_id[cat_id]} for cat_id in sorted(unused_ids)]
 
     return {"used_categories": used_categories, "unused_categories": unused_categories}
 
 
-def bulk_update_urls(client, category_id, new_urls_file):
+def bulk_update_urls(client, category, new_urls_file):
     """
     Updates a specific category’s URLs by merging the existing URLs and the new ones from a file.
 
     Args:
         client (LegacyZIAClient): Authenticated ZIA SDK client.
-        category_id (str): ID of the category to update.
+        category: URL category selected from the fetch_custom_categories() listing.
         new_urls_file (str): File containing the new URLs.
 
     Returns:
         None
     """
     try:
-        # Fetch the category details
-        category, _, error = client.url_categories.get_category(category_id)
+        # The listing may be minutes old by now (it was taken before the prompts, possibly from the cache),
+        # so the category is fetched again right before the update; otherwise URLs added by someone else
+        # in the meantime would be overwritten
+        category, _, error = client.url_categories.get_category(category.id)
         if error:
-            print(f"[ERROR] Failed to fetch category '{category_id}': {error}")
+            logger.error(f"Failed to fetch category: {error}")
             exit(1)
 
-        existing_urls = set(category.urls)
-        print(f"[INFO] Found {len(existing_urls)} existing URLs in '{category.configured_name}'.")
+        # ZIA keeps a category's URLs unique, so the existing list is reused as-is and
+        # a set is only built to probe incoming URLs against
+        existing_urls = category.urls or []
+        seen_urls = set(existing_urls)
+        logger.info(f"Found {len(existing_urls)} existing URLs in '{category.configured_name}'.")
 
-        # Read new URLs from file
+        # Stream the file, keeping only URLs not already in the category (in file order)
+        additions = []
         with open(new_urls_file, "r") as f:
-            new_urls = {line.strip() for line in f if line.strip()}
-        print(f"[INFO] Found {len(new_urls)} new URLs in '{new_urls_file}'.")
-
-        # Merge URLs and update the category
-        combined_urls = list(existing_urls | new_urls)
+            for line in f:
+                url = line.strip()
+                if url and url not in seen_urls:
+                    seen_urls.add(url)
+                    additions.append(url)
+        logger.info(f"Found {len(additions)} new URLs in '{new_urls_file}'.")
+
+        # Nothing to change: skip the update call and the (slow) policy activation
+        if not additions:
+            logger.info("No new URLs; skipping update and activation.")
+            return
+
+        # Append the additions to the existing list instead of rebuilding it from a union set
+        combined_urls = existing_urls + additions
         updated_category, _, error = client.url_categories.update_url_category(
             category_id=category.id,
             configured_name=category.configured_name,
@@ -161,19 +157,20 @@ def bulk_update_urls(client, category_id, new_urls_file):
             urls=combined_urls
         )
         if error:
-            print(f"[ERROR] Failed to update category '{category_id}': {error}")
+            logger.error(f"Failed to update category '{category.id}': {error}")
             exit(1)
+
         activation_response, _, activation_error = client.activate.activate()
         if activation_error:
-            print(f"[ERROR] Failed to activate changes: {activation_error}")
+            logger.error(f"Failed to activate changes: {activation_error}")
             exit(1)
-        #    print(f"[INFO] Activation successful!\n{activation_response}")
-        print(f"[INFO] Successfully updated '{updated_category.configured_name}' with {len(updated_category.urls)} total URLs.")
+        #    logger.info(f"Activation successful!\n{activation_response}")
+        logger.info(f"Successfully updated '{updated_category.configured_name}' with {len(combined_urls if updated_category.urls is None else updated_category.urls)} total URLs.")
     except FileNotFoundError:
-        print(f"[ERROR] The file '{new_urls_file}' was not found.", file=sys.stderr)
+        logger.error(f"The file '{new_urls_file}' was not found.")
         exit(1)
     except Exception as e:
-        print(f"[ERROR] Failed to update URLs in category: {e}")
+        logger.error(f"Failed to update URLs in category: {e}")
         exit(1)
 
 
@@ -183,9 +180,9 @@ def main():
     Provides a workflow for fetching categories, analyzing their usage, and optionally updating them.
     """
     try:
-        with LegacyZIAClient(config) as parent_client:
-            print("[INFO] Authenticating to ZIA using Python SDK...")
-            print("[INFO] Authentication successful!")
+        with LegacyZIAClient(dict(config)) as parent_client:
+            logger.info("Authenticating to ZIA using Python SDK...")
+            logger.info("Authentication successful!")
 
             # Assign client to `client.zia_legacy_client`
             client = parent_client.zia_legacy_client
@@ -221,11 +218,15 @@ def main():
             update_choice = input("\nDo you want to update URLs in a category? (yes/no): ").strip().lower()
             if update_choice == "yes":
                 category_id = input("Enter the Category ID to update (e.g., CUSTOM_01): ").strip()
+                selected = next((cat["category"] for cat in custom_categories if cat["id"] == category_id), None)
+                if selected is None:
+                    logger.error(f"Category '{category_id}' is not one of the custom categories listed above.")
+                    exit(1)
                 new_urls_file = input("Enter the file path for new URLs (e.g., urls.txt): ").strip()
-                bulk_update_urls(client, category_id, new_urls_file)
+                bulk_update_urls(client, selected, new_urls_file)
 
     except Exception as e:
-        print(f"[ERROR] An exception occurred during execution: {e}")
+        logger.error(f"An exception occurred during execution: {e}")
         exit(1)
 
 
@@ -1,85 +1,90 @@
 #!/usr/bin/env python
 
-from dotenv import load_dotenv
 import os
 import sys
 import csv
+import logging
 from zscaler.oneapi_client import LegacyZIAClient
+from _config import get_zia_config, configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 def main():
     """
     Main function to update a ZIA custom URL category with URLs and Ticket ID extracted from the first row of the CSV file.
     """
-    # Load environment variables
-    load_dotenv()
-
-    # Environment configuration
-    config = {
-        "username": os.getenv("ZIA_USERNAME"),
-        "password": os.getenv("ZIA_PASSWORD"),
-        "api_key": os.getenv("ZIA_API_KEY"),
-        "cloud": os.getenv("ZIA_CLOUD"),
-    }
-    
-    if not all(config.values()):
-        print("Error: Missing one or more required environment variables (ZIA_USERNAME, ZIA_PASSWORD, ZIA_API_KEY, ZIA_CLOUD).", file=sys.stderr)
-        sys.exit(1)
+    # Load and validate the shared ZIA configuration (this also loads the .env file)
+    config = get_zia_config()
 
     # Define category ID and CSV file paths
     category_id = os.getenv("ZIA_DEMO_CATEGORY", "CUSTOM_01")  # Target custom category for updates
     urls_file = "source_urls.csv"  # Input CSV containing URLs and Ticket ID
     ticket_id_field = "TicketID"  # Field name for Ticket ID in the CSV file
 
+    # Check the input file before signing in, so a bad path doesn't cost a ZIA login round-trip
+    if not os.path.isfile(urls_file):
+        logger.error(f"The file '{urls_file}' was not found.")
+        sys.exit(1)
+
     try:
         # Step 1: Authenticate with ZIA SDK
-        with LegacyZIAClient(config) as client:
-            print("[INFO] Successfully authenticated with ZIA.")
+        with LegacyZIAClient(dict(config)) as client:
+            logger.info("Successfully authenticated with ZIA.")
 
             # --- Step 2: Fetch category details ---
-            print(f"[INFO] Fetching details for category ID: {category_id}...")
+            logger.info(f"Fetching details for category ID: {category_id}...")
             category, _, err = client.zia.url_categories.get_category(category_id)
             if err:
-                print(f"[ERROR] Failed to fetch category '{category_id}': {err}", file=sys.stderr)
+                logger.error(f"Failed to fetch category '{category_id}': {err}")
                 sys.exit(1)
 
             # Get existing URLs
+            # The category's list is already unique; the set is only used for membership tests
             existing_urls = set(category.urls)
-            print(f"[INFO] Found {len(existing_urls)} existing URLs in category '{category.configured_name}'.")
+            logger.info(f"Found {len(existing_urls)} existing URLs in category '{category.configured_name}'.")
 
             # --- Step 3: Read URLs and Ticket ID from the CSV file ---
-            print(f"[INFO] Reading URLs and ticket ID from file: '{urls_file}'...")
+            logger.info(f"Reading URLs and ticket ID from file: '{urls_file}'...")
             try:
                 with open(urls_file, "r") as csvfile:
                     reader = csv.DictReader(csvfile)
 
-                    # Extract Ticket ID from the first row
-                    first_row = next(reader, None)
-                    if first_row and ticket_id_field in first_row:
-                        ticket_id = first_row[ticket_id_field].strip()
-                    else:
-                        ticket_id = "UNKNOWN_TICKET_ID"
-
-                    # Extract URLs from all rows in the CSV file
-                    urls_to_add = {row["URL"].strip() for row in reader if row.get("URL", "").strip()}
+                    # Read the Ticket ID from the first row and the URLs from every row (including
+                    # the first) in a single pass, keeping only the truly new URLs as rows stream in
+                    # so URLs already in the category are never stored twice
+                    ticket_id = "UNKNOWN_TICKET_ID"
+                    urls_read = 0
+                    new_urls_to_add = []
+                    for row_number, row in enumerate(reader):
+                        if row_number == 0 and row.get(ticket_id_field):
+                            ticket_id = row[ticket_id_field].strip()
+                        url = (row.get("URL") or "").strip()
+                        if not url:
+                            continue
+                        urls_read += 1
+                        if url not in existing_urls:
+                            existing_urls.add(url)
+                            new_urls_to_add.append(url)
             except Exception as e:
-                print(f"[ERROR] Failed to process CSV file '{urls_file}': {e}", file=sys.stderr)
+                logger.error(f"Failed to process CSV file '{urls_file}': {e}")
                 sys.exit(1)
 
-            print(f"[INFO] Found {len(urls_to_add)} URLs in the CSV file.")
-            print(f"[INFO] Extracted Ticket ID: {ticket_id}")
+            logger.info(f"Found {urls_read} URLs in the CSV file.")
+            logger.info(f"Extracted Ticket ID: {ticket_id}")
 
             # --- Step 4: Combine existing and new URLs ---
-            print("[INFO] Combining new URLs with existing ones...")
-            new_urls_to_add = urls_to_add - existing_urls  # Identify truly new URLs
+            logger.info("Combining new URLs with existing ones...")
             if not new_urls_to_add:
-                print("[INFO] No new URLs to add. All URLs already exist in the category.")
+                logger.info("No new URLs to add. All URLs already exist in the category.")
                 sys.exit(0)
 
-            print(f"[INFO] Adding {len(new_urls_to_add)} new URLs to the category.")
-            combined_urls = list(existing_urls | urls_to_add)  # Merge URLs
+            logger.info(f"Adding {len(new_urls_to_add)} new URLs to the category.")
+            # Append the new URLs to the category's existing list, so no union set has to be built
+            combined_urls = category.urls + new_urls_to_add
 
             # --- Step 5: Update URL category ---
-            print("[INFO] Updating category with new URLs and updated description...")
+            logger.info("Updating category with new URLs and updated description...")
             updated_description = f"{category.description} | Updated with Ticket ID: {ticket_id}"
 
             updated_category, _, err = client.zia.url_categories.update_url_category(
@@ -90,23 +95,24 @@ def main():
                 urls=combined_urls                        # Send updated list of URLs
             )
             if err:
-                print(f"[ERROR] Failed to update category '{category_id}': {err}", file=sys.stderr)
+                logger.error(f"Failed to update category '{category_id}': {err}")
                 sys.exit(1)
 
-            print(f"[INFO] Successfully updated category '{updated_category.configured_name}'.")
-            print(f"[INFO] Total URLs now in category: {len(updated_category.urls)}")
+            logger.info(f"Successfully updated category '{updated_category.configured_name}'.")
+            if updated_category.urls is not None:
+                logger.info(f"Total URLs now in category: {len(updated_category.urls)}")
 
             # --- Step 6: Activate policy changes ---
-            print("[INFO] Activating policy changes...")
+            logger.info("Activating policy changes...")
             activation_response, _, activation_error = client.zia.activate.activate()
             if activation_error:
-                print(f"[ERROR] Failed to activate changes: {activation_error}", file=sys.stderr)
+                logger.error(f"Failed to activate changes: {activation_error}")
                 sys.exit(1)
-            print("[INFO] Activation successful!")
-            print(f"[INFO] Activation Response: {activation_response}")
+            logger.info("Activation successful!")
+            logger.info(f"Activation Response: {activation_response}")
 
     except Exception as e:
-        print(f"[ERROR] An unexpected error occurred: {e}", file=sys.stderr)
+        logger.error(f"An unexpected error occurred: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
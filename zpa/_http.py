@@ -0,0 +1,122 @@
+import sys
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def find_sessions(client, depth: int = 2):
+    """
+    Returns the requests.Session objects reachable from `client` through its attributes.
+
+    The SDK keeps its HTTP session on internal helper objects whose names differ between
+    versions, so sessions are located by type rather than by attribute name.
+    """
+    sessions = []
+    visited = set()
+
+    def walk(obj, level):
+        if id(obj) in visited:
+            return
+        visited.add(id(obj))
+        if isinstance(obj, requests.Session):
+            sessions.append(obj)
+            return
+        if level == 0:
+            return
+        for value in list(getattr(obj, "__dict__", {}).values()):
+            walk(value, level - 1)
+
+    walk(client, depth)
+    return sessions
+
+
+class _PooledRequests:
+    """
+    Stand-in for the `requests` module whose request helpers go through one shared Session.
+    Everything else (exceptions, models, ...) is looked up on the real module.
+    """
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.request = session.request
+        self.get = session.get
+        self.post = session.post
+        self.put = session.put
+        self.patch = session.patch
+        self.delete = session.delete
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def _mount_pool(session: requests.Session, pool_size: int):
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=0.5),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def pool_module_requests(obj, pool_size: int = 16) -> bool:
+    """
+    Routes the module-level requests.request()/post() calls made by `obj`'s module through
+    one pooled Session.
+
+    The legacy ZPA helper in recent SDK versions calls requests.request() directly, which opens
+    a new TCP/TLS connection for every API call. This affects every instance from that module,
+    which is fine for these single-tenant scripts.
+
+    Returns:
+        True if the module's calls are now pooled (including by an earlier call), otherwise False.
+    """
+    module = sys.modules.get(type(obj).__module__)
+    current = getattr(module, "requests", None)
+    if isinstance(current, _PooledRequests):
+        return True
+    if current is not requests:
+        return False
+    session = requests.Session()
+    _mount_pool(session, pool_size)
+    module.requests = _PooledRequests(session)
+    return True
+
+
+def mount_connection_pool(client, pool_size: int = 16) -> int:
+    """
+    Mounts a keep-alive HTTPAdapter sized for `pool_size` concurrent requests on every SDK session
+    (for both http:// and https://), so threads share pooled TCP/TLS connections instead of opening
+    new ones. Idempotent requests are retried on connection errors with backoff.
+
+    If the client has a legacy ZPA helper that bypasses sessions, its requests are pooled as well.
+
+    Returns:
+        The number of sessions (and legacy helpers) that were configured.
+    """
+    sessions = find_sessions(client)
+    for session in sessions:
+        _mount_pool(session, pool_size)
+    configured = len(sessions)
+
+    legacy_client = getattr(client, "zpa_legacy_client", None)
+    if legacy_client is not None and pool_module_requests(legacy_client, pool_size):
+        configured += 1
+    return configured
+
+
+def close_connection_pool(client):
+    """
+    Closes the SDK sessions and the pooled legacy-helper session set up by mount_connection_pool,
+    releasing their sockets right away instead of when the client is garbage collected.
+    A closed session simply opens new connections if it is used again.
+    """
+    for session in find_sessions(client):
+        session.close()
+
+    legacy_client = getattr(client, "zpa_legacy_client", None)
+    if legacy_client is not None:
+        module = sys.modules.get(type(legacy_client).__module__)
+        pooled = getattr(module, "requests", None)
+        if isinstance(pooled, _PooledRequests):
+            pooled.session.close()
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# ZPA returns at most 500 records per page; an unpaged list_segments() only returns the first (small) page
+SEGMENT_PAGE_SIZE = 500
+
+
+def _call(method, **kwargs):
+    return method(**kwargs)
+
+
+def list_all_segments(client, page_size: int = SEGMENT_PAGE_SIZE, max_workers: int = 1, call=_call):
+    """
+    Fetches every application segment, page by page.
+
+    Page 1 is fetched first. While pages come back full, the next `max_workers` pages are
+    requested in parallel; a short or empty page marks the end of the list. Segments are
+    de-duplicated by ID in case the inventory shifts between page requests.
+
+    Args:
+        client: The legacy ZPA client.
+        page_size (int): Records requested per page.
+        max_workers (int): Pages requested at the same time after the first one.
+        call (callable): Invokes `call(method, **kwargs)` for each request, so a script can
+            route the calls through its own rate limiting.
+
+    Returns:
+        The same (segments, response, error) tuple shape as the SDK's list_segments().
+    """
+    def fetch_page(page: int):
+        return call(client.application_segment.list_segments, query_params={"page": page, "page_size": page_size})
+
+    segments, _, err = fetch_page(1)
+    if err:
+        return None, None, err
+
+    all_segments = list(segments or ())
+    seen_ids = {segment.id for segment in all_segments}
+    more_pages = len(all_segments) >= page_size
+    next_page = 2
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while more_pages:
+            window = range(next_page, next_page + max_workers)
+            added = 0
+            for page_segments, _, page_err in executor.map(fetch_page, window):
+                if page_err:
+                    return None, None, page_err
+                page_segments = page_segments or ()
+                for segment in page_segments:
+                    if segment.id not in seen_ids:
+                        seen_ids.add(segment.id)
+                        all_segments.append(segment)
+                        added += 1
+                if len(page_segments) < page_size:
+                    more_pages = False
+                    break
+            # A window with nothing new means the pages are repeating; stop rather than loop forever
+            if not added:
+                more_pages = False
+            next_page += max_workers
+
+    return all_segments, None, None
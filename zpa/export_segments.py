@@ -1,16 +1,92 @@
 import os
 import csv
 import sys
+import json
+import time
+import hashlib
 import argparse
+import logging
+import functools
 from dotenv import load_dotenv
-from typing import List, Dict, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, FrozenSet
 from zscaler.oneapi_client import LegacyZPAClient
+from _http import mount_connection_pool
+from _segments import list_all_segments, SEGMENT_PAGE_SIZE
+
+# INFO records go to stdout; warnings and errors go to stderr, as the print() calls did
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.addFilter(lambda record: record.levelno < logging.WARNING)
+_stderr_handler = logging.StreamHandler(sys.stderr)
+_stderr_handler.setLevel(logging.WARNING)
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s", handlers=[_stdout_handler, _stderr_handler])
+logger = logging.getLogger(__name__)
+
+# One worker per pre-fetch call: server groups, segment groups, three segment types and the segment list
+PREFETCH_WORKERS = 6
+
+# Server and segment groups change rarely, so their ID-to-name maps are cached on disk between runs
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "zpa")
+CACHE_TTL_S = 3600
+
+# Segment list pages requested in parallel after the first one
+PAGE_WORKERS = 8
+
+# Enough pooled connections for the pre-fetch workers plus the page workers running at the same time
+HTTP_POOL_SIZE = 16
+
+# Column order of the export; rows are written as tuples in this order
+CSV_HEADER = (
+    "NAME", "DESCRIPTION", "ENABLED", "SEGMENT_GROUP_ID",
+    "SERVER_GROUP_IDS", "DOMAINS", "TCP_PORTS", "UDP_PORTS",
+    "DOUBLE_ENCRYPT", "IS_BROWSER_ACCESS", "IS_PRA", "IS_INSPECTION"
+)
 
 # --- Helper Functions ---
 
+def disk_cached(ttl_s: int):
+    """
+    Caches the result of a `(client, resource_type)` lookup as a JSON file under CACHE_DIR.
+
+    The wrapped function gains `customer_id` and `use_cache` arguments: entries are keyed by
+    (customer_id, resource_type) and reused while younger than `ttl_s` seconds. Empty results
+    (which signal a failed fetch) are never cached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(client, resource_type: str, customer_id: str = None, use_cache: bool = True):
+            if not use_cache or not customer_id:
+                return func(client, resource_type)
+
+            digest = hashlib.sha1(f"{customer_id}:{resource_type}".encode("utf-8")).hexdigest()
+            path = os.path.join(CACHE_DIR, f"{digest}.json")
+            try:
+                if time.time() - os.path.getmtime(path) < ttl_s:
+                    with open(path, "r", encoding="utf-8") as f:
+                        cached_map = json.load(f)
+                    logger.info(f"Using cached {resource_type.replace('_', ' ')} ({len(cached_map)} entries).")
+                    return cached_map
+            except (OSError, ValueError):
+                pass  # Missing, expired or unreadable cache entries are simply refetched
+
+            result = func(client, resource_type)
+            if result:
+                try:
+                    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(result, f)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    logger.warning(f"Could not write cache file '{path}': {e}")
+            return result
+        return wrapper
+    return decorator
+
+@disk_cached(CACHE_TTL_S)
 def get_id_to_name_map(client, resource_type: str) -> Dict[str, str]:
     """Fetches ZPA resources and returns a mapping of their ID to their Name."""
-    print(f"[INFO] Fetching all {resource_type.replace('_', ' ')}...")
+    logger.info(f"Fetching all {resource_type.replace('_', ' ')}...")
     try:
         if resource_type == 'server_groups':
             resources, _, err = client.server_groups.list_groups()
@@ -19,13 +95,13 @@ def get_id_to_name_map(client, resource_type: str) -> Dict[str, str]:
         else:
             raise ValueError("Invalid resource_type specified.")
         if err:
-            print(f"[ERROR] Failed to fetch {resource_type.replace('_', ' ')}: {err}", file=sys.stderr)
+            logger.error(f"Failed to fetch {resource_type.replace('_', ' ')}: {err}")
             return {}
         id_map = {res.id: res.name for res in resources}
-        print(f"  > Found {len(id_map)} {resource_type.replace('_', ' ')}.")
+        logger.info(f"Found {len(id_map)} {resource_type.replace('_', ' ')}.")
         return id_map
     except Exception as e:
-        print(f"[ERROR] An exception occurred while fetching {resource_type}: {e}", file=sys.stderr)
+        logger.error(f"An exception occurred while fetching {resource_type}: {e}")
         return {}
 
 def format_ports_to_string(port_ranges: List[Dict]) -> str:
@@ -38,7 +114,7 @@ def format_ports_to_string(port_ranges: List[Dict]) -> str:
         formatted_ports.append(p_from if p_from == p_to else f"{p_from}-{p_to}")
     return ",".join(formatted_ports)
 
-def get_segment_ids_by_type(client, app_type: str) -> Set[str]:
+def get_segment_ids_by_type(client, app_type: str) -> FrozenSet[str]:
     """
     Uses the app_segment_by_type controller to fetch segment IDs for a specific type.
     
@@ -47,23 +123,23 @@ def get_segment_ids_by_type(client, app_type: str) -> Set[str]:
         app_type (str): The type to query (e.g., "BROWSER_ACCESS").
 
     Returns:
-        A set of segment IDs for the given type.
+        A frozenset of segment IDs for the given type (it is only ever probed, never modified).
     """
-    print(f"[INFO] Fetching IDs for '{app_type}' segments...")
+    logger.info(f"Fetching IDs for '{app_type}' segments...")
     try:
         # Using the exact method you found!
         segments, _, err = client.app_segment_by_type.get_segments_by_type(application_type=app_type)
         
         if err:
-            print(f"[ERROR] Failed to fetch '{app_type}' segments: {err}", file=sys.stderr)
-            return set()
+            logger.error(f"Failed to fetch '{app_type}' segments: {err}")
+            return frozenset()
             
-        segment_ids = {segment.id for segment in segments}
-        print(f"  > Found {len(segment_ids)} '{app_type}' segments.")
+        segment_ids = frozenset(segment.id for segment in segments)
+        logger.info(f"Found {len(segment_ids)} '{app_type}' segments.")
         return segment_ids
     except Exception as e:
-        print(f"[ERROR] An exception occurred while fetching '{app_type}' segments: {e}", file=sys.stderr)
-        return set()
+        logger.error(f"An exception occurred while fetching '{app_type}' segments: {e}")
+        return frozenset()
 
 # --- Main Logic ---
 
@@ -72,6 +148,7 @@ def main():
     
     parser = argparse.ArgumentParser(description="Export ZPA Application Segments to a CSV file.")
     parser.add_argument("--outfile", default="zpa_app_segments_export.csv", help="Path to the output CSV file.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch server and segment groups from ZPA instead of the local cache.")
     args = parser.parse_args()
 
     load_dotenv()
@@ -82,76 +159,95 @@ def main():
         "cloud": os.getenv("ZPA_CLOUD")
     }
     if not all(config.values()):
-        print("\n[ERROR] Missing required environment variables.", file=sys.stderr)
+        logger.error("Missing required environment variables.")
         sys.exit(1)
 
     try:
         with LegacyZPAClient(config) as parent_client:
             legacy_client = parent_client.zpa_legacy_client
-            print("[INFO] Successfully connected to ZPA tenant.")
+            logger.info("Successfully connected to ZPA tenant.")
+
+            # Size the SDK's connection pool for the concurrent pre-fetch and page requests below
+            if not mount_connection_pool(parent_client, pool_size=HTTP_POOL_SIZE):
+                logger.info("No SDK HTTP session found to tune; using the SDK's default connection handling.")
 
             # --- Pre-fetch all required data ---
-            server_group_map = get_id_to_name_map(legacy_client, 'server_groups')
-            segment_group_map = get_id_to_name_map(legacy_client, 'segment_groups')
+            # The lookups are independent API calls, so they run concurrently to overlap their latency
+            logger.info("Fetching master list of all application segments...")
+            with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as executor:
+                use_cache = not args.no_cache
+                server_groups_future = executor.submit(get_id_to_name_map, legacy_client, 'server_groups', config["customer_id"], use_cache)
+                segment_groups_future = executor.submit(get_id_to_name_map, legacy_client, 'segment_groups', config["customer_id"], use_cache)
+                # Fetch specialized segment IDs using the correct method
+                ba_future = executor.submit(get_segment_ids_by_type, legacy_client, "BROWSER_ACCESS")
+                pra_future = executor.submit(get_segment_ids_by_type, legacy_client, "SECURE_REMOTE_ACCESS")
+                inspection_future = executor.submit(get_segment_ids_by_type, legacy_client, "INSPECT")
+                # Fetch the master list of all application segments
+                segments_future = executor.submit(list_all_segments, legacy_client, SEGMENT_PAGE_SIZE, PAGE_WORKERS)
+
+                server_group_map = server_groups_future.result()
+                segment_group_map = segment_groups_future.result()
+                ba_segment_ids = ba_future.result()
+                pra_segment_ids = pra_future.result()
+                inspection_segment_ids = inspection_future.result()
+                all_segments, _, err = segments_future.result()
+
             if not server_group_map or not segment_group_map:
-                print("[ERROR] Could not fetch Server or Segment Group mappings. Aborting.", file=sys.stderr)
+                logger.error("Could not fetch Server or Segment Group mappings. Aborting.")
                 sys.exit(1)
 
-            # Fetch specialized segment IDs using the correct method
-            ba_segment_ids = get_segment_ids_by_type(legacy_client, "BROWSER_ACCESS")
-            pra_segment_ids = get_segment_ids_by_type(legacy_client,"SECURE_REMOTE_ACCESS")
-            inspection_segment_ids = get_segment_ids_by_type(legacy_client, "INSPECT")
-
-            # Fetch the master list of all application segments
-            print("[INFO] Fetching master list of all application segments...")
-            all_segments, _, err = legacy_client.application_segment.list_segments()
             if err:
-                print(f"[ERROR] Failed to fetch master application segment list: {err}", file=sys.stderr)
+                logger.error(f"Failed to fetch master application segment list: {err}")
                 sys.exit(1)
-            print(f"  > Found {len(all_segments)} total segments to process.")
+            logger.info(f"Found {len(all_segments)} total segments to process.")
 
-            # --- Process and enrich data for CSV ---
-            csv_rows = []
-            for segment in all_segments:
-                server_group_names = [server_group_map.get(sg['id'], f"UNKNOWN_ID_{sg['id']}") for sg in segment.server_groups]
-                
-                row_data = {
-                    "NAME": segment.name,
-                    "DESCRIPTION": segment.description,
-                    "ENABLED": str(segment.enabled).lower(),
-                    "SEGMENT_GROUP_ID": segment_group_map.get(segment.segment_group_id, f"UNKNOWN_ID_{segment.segment_group_id}"),
-                    "SERVER_GROUP_IDS": ",".join(server_group_names),
-                    "DOMAINS": ",".join(segment.domain_names),
-                    "TCP_PORTS": format_ports_to_string(segment.tcp_port_range),
-                    "UDP_PORTS": format_ports_to_string(segment.udp_port_range),
-                    "DOUBLE_ENCRYPT": str(segment.double_encrypt).lower(),
-                    # Check if the segment ID is in our specialized sets
-                    "IS_BROWSER_ACCESS": str(segment.id in ba_segment_ids).lower(),
-                    "IS_PRA": str(segment.id in pra_segment_ids).lower(),
-                    "IS_INSPECTION": str(segment.id in inspection_segment_ids).lower(),
-                }
-                csv_rows.append(row_data)
-
-            if not csv_rows:
-                print("[INFO] No application segments found to export.")
+            if not all_segments:
+                logger.info("No application segments found to export.")
                 sys.exit(0)
-            
+
+            # --- Process and enrich data for CSV ---
+            # Merge the three specialized ID sets into one lookup, so each segment needs a single probe.
+            # The flags are stored as the CSV's "true"/"false" strings, ready to be written.
+            segment_type_flags = {}
+            for position, segment_ids in enumerate((ba_segment_ids, pra_segment_ids, inspection_segment_ids)):
+                for segment_id in segment_ids:
+                    segment_type_flags.setdefault(segment_id, ["false", "false", "false"])[position] = "true"
+            no_type_flags = ("false", "false", "false")
+
+            # Bind the lookups once instead of resolving the .get attribute on every row
+            sg_get = server_group_map.get
+            seg_get = segment_group_map.get
+            flags_get = segment_type_flags.get
+
+            def build_row(segment):
+                is_ba, is_pra, is_inspection = flags_get(segment.id, no_type_flags)
+                # Values are positional, in CSV_HEADER order
+                return (
+                    segment.name,
+                    segment.description,
+                    str(segment.enabled).lower(),
+                    seg_get(segment.segment_group_id) or f"UNKNOWN_ID_{segment.segment_group_id}",
+                    ",".join(sg_get(sg['id']) or f"UNKNOWN_ID_{sg['id']}" for sg in segment.server_groups),
+                    ",".join(segment.domain_names),
+                    format_ports_to_string(segment.tcp_port_range),
+                    format_ports_to_string(segment.udp_port_range),
+                    str(segment.double_encrypt).lower(),
+                    is_ba,
+                    is_pra,
+                    is_inspection,
+                )
+
             # --- Write to CSV File ---
-            print(f"\n[INFO] Writing {len(csv_rows)} records to '{args.outfile}'...")
-            header = [
-                "NAME", "DESCRIPTION", "ENABLED", "SEGMENT_GROUP_ID", 
-                "SERVER_GROUP_IDS", "DOMAINS", "TCP_PORTS", "UDP_PORTS", 
-                "DOUBLE_ENCRYPT", "IS_BROWSER_ACCESS", "IS_PRA", "IS_INSPECTION"
-            ]
-            
+            # Each row is written as soon as it is built, so the enriched rows are never all held in memory
+            logger.info(f"Writing {len(all_segments)} records to '{args.outfile}'...")
             with open(args.outfile, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=header)
-                writer.writeheader()
-                writer.writerows(csv_rows)
-            print(f"\n[SUCCESS] Export complete. Data saved to '{args.outfile}'.")
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADER)
+                writer.writerows(build_row(segment) for segment in all_segments)
+            logger.info(f"Export complete. Data saved to '{args.outfile}'.")
 
     except Exception as e:
-        print(f"\n[FATAL] An unexpected error occurred: {e}", file=sys.stderr)
+        logger.critical(f"An unexpected error occurred: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -1,133 +1,421 @@
+import io
 import os
 import csv
 import sys
+import hashlib
 import argparse
+import threading
+from functools import lru_cache
+from itertools import islice
+from collections import Counter
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
 from zscaler.oneapi_client import LegacyZPAClient
+from _http import mount_connection_pool, close_connection_pool
+from _segments import list_all_segments
+
+# Parent segments created at the same time unless ZPA_MAX_CONCURRENCY is set;
+# keep it within the tenant's API rate limit
+DEFAULT_MAX_CONCURRENCY = 6
+
+# Concurrent BA/PRA child-app requests per parent segment
+CHILD_APP_WORKERS = 8
+
+# Rows read from the CSV and queued to the workers at a time (see --chunk-size)
+DEFAULT_CHUNK_SIZE = 500
+
+# Pooled keep-alive connections shared by the row and child-app workers
+HTTP_POOL_SIZE = 32
+
+# Upper bound on API calls in flight at once across all row and child-app workers.
+# The nested pools could otherwise reach DEFAULT_MAX_CONCURRENCY * CHILD_APP_WORKERS requests.
+MAX_IN_FLIGHT_REQUESTS = 16
+_request_slots = threading.BoundedSemaphore(MAX_IN_FLIGHT_REQUESTS)
+
+def api_call(method, **kwargs):
+    """Calls an SDK method once a request slot is free, so the tenant's rate limit is respected."""
+    with _request_slots:
+        return method(**kwargs)
 
 # --- Helper functions (Unchanged) ---
+# CSV flag and port columns repeat the same few values across rows, so their parsing is memoized
+@lru_cache(maxsize=256)
 def str2bool(value: str) -> bool:
     return str(value).lower() in ("1", "true", "yes", "y")
 
+def group_key(name: str) -> str:
+    """Normalizes a group name so lookups ignore surrounding whitespace and case."""
+    return name.strip().casefold()
+
 def list_server_groups(client) -> Dict[str, str]:
     groups, _, err = client.server_groups.list_groups()
     if err:
         print(f"[ERROR] Failed to fetch server groups: {err}", file=sys.stderr)
         return {}
-    return {group.name: group.id for group in groups}
+    return {group_key(group.name): group.id for group in groups}
 
 def list_segment_groups(client) -> Dict[str, str]:
     groups, _, err = client.segment_groups.list_groups()
     if err:
         print(f"[ERROR] Failed to fetch segment groups: {err}", file=sys.stderr)
         return {}
-    return {group.name: group.id for group in groups}
+    return {group_key(group.name): group.id for group in groups}
+
+def segment_fingerprint(domain_names: Iterable[str], tcp_port_range: Iterable[Dict], udp_port_range: Iterable[Dict], segment_group_id) -> str:
+    """
+    Returns a stable SHA-1 fingerprint of what a segment publishes: its domains, TCP/UDP port ranges
+    and segment group. Order and domain case are ignored, so a CSV row and an existing segment that
+    cover the same applications get the same fingerprint even under a different name.
+    """
+    key = (
+        sorted({domain.strip().casefold() for domain in domain_names or ()}),
+        sorted((str(port["from"]), str(port["to"])) for port in tcp_port_range or ()),
+        sorted((str(port["from"]), str(port["to"])) for port in udp_port_range or ()),
+        str(segment_group_id),
+    )
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+def fetch_existing_segments(client) -> Tuple[Optional[FrozenSet[str]], FrozenSet[str]]:
+    """
+    Fetches every application segment in the tenant once (all pages) and indexes it two ways:
+    by name, and by segment_fingerprint, to catch rows that duplicate a segment under another name.
+    Both are returned as read-only frozensets shared by the worker threads; names are interned.
+
+    If the listing fails, the names are returned as None so the caller checks each chunk's names
+    with search_existing_segment_names instead; fingerprint matching is then unavailable.
+    """
+    print("[INFO] Fetching all existing application segments...")
+    try:
+        all_existing_segments, _, err = list_all_segments(client, call=api_call)
+    except Exception as e:
+        err = e
+    if err:
+        print(f"[WARNING] Could not fetch existing segments: {err}. Checking names by search instead; rows duplicating a segment under another name won't be detected.")
+        return None, frozenset()
+    existing_segment_names = frozenset(sys.intern(segment.name) for segment in all_existing_segments)
+    existing_fingerprints = frozenset(
+        segment_fingerprint(segment.domain_names, segment.tcp_port_range, segment.udp_port_range, segment.segment_group_id)
+        for segment in all_existing_segments
+    )
+    print(f"  > Found {len(existing_segment_names)} existing segments.")
+    return existing_segment_names, existing_fingerprints
+
+def search_existing_segment_names(client, names: Iterable[str], executor) -> Optional[FrozenSet[str]]:
+    """
+    Returns which of `names` already exist, using the server-side `search` filter of list_segments
+    so only matching segments are downloaded. Used when the full listing in fetch_existing_segments fails.
+    One request per name, run concurrently on `executor`.
+
+    Returns:
+        A frozenset of the existing (interned) names, or None if any search failed.
+    """
+    def search(name):
+        try:
+            segments, _, err = api_call(client.application_segment.list_segments, query_params={"search": name})
+        except Exception as e:
+            segments, err = None, e
+        return name, segments, err
 
-def parse_ports(port_string: str) -> List[str]:
+    found = set()
+    for name, segments, err in executor.map(search, set(names)):
+        if err:
+            return None
+        # The search also matches partial names, so only an exact match counts
+        if any(segment.name == name for segment in segments or ()):
+            found.add(sys.intern(name))
+    return frozenset(found)
+
+@lru_cache(maxsize=256)
+def parse_ports(port_string: str) -> Tuple[str, ...]:
+    # Returns a tuple so the cached result can be shared safely between rows
     ports = (port_string or "").strip().split(",")
-    return [p.strip() for p in ports if p.strip()]
+    return tuple(p.strip() for p in ports if p.strip())
+
+# Ports that get a PRA child app, and the protocol it uses
+PRA_PROTOCOLS = {"22": "SSH", "3389": "RDP"}
+
+# Ports whose BA child app is served over HTTPS; every other port uses HTTP
+BA_HTTPS_PORTS = frozenset(("443", "8443"))
+
+def split_names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",")]
 
-def parse_csv_row(row: Dict) -> Optional[Dict]:
+# Import CSV schema: (row key, CSV column, default when the column or cell is absent, transform).
+# iter_rows resolves the column positions once per file; parse_csv_row then just applies the transforms.
+SCHEMA = (
+    ("name", "NAME", "", str.strip),
+    ("description", "DESCRIPTION", "", str.strip),
+    ("enabled", "ENABLED", "true", str2bool),
+    ("segment_group_name", "SEGMENT_GROUP_ID", "", str.strip),
+    ("server_group_names", "SERVER_GROUP_IDS", "", split_names),
+    ("domain_names", "DOMAINS", "", split_names),
+    ("tcp_ports", "TCP_PORTS", "", parse_ports),
+    ("udp_ports", "UDP_PORTS", "", parse_ports),
+    ("double_encrypt", "DOUBLE_ENCRYPT", "false", str2bool),
+    ("is_browser_access", "IS_BROWSER_ACCESS", "false", str2bool),
+    ("is_pra", "IS_PRA", "false", str2bool),
+    ("is_inspection", "IS_INSPECTION", "false", str2bool),
+)
+
+def parse_csv_row(row: List[str], fields: Tuple) -> Optional[Dict]:
     # This function just prepares the dictionary from the CSV row.
-    # Validation of group names will happen later.
-    if not all([row.get("NAME"), row.get("DOMAINS"), row.get("SERVER_GROUP_IDS")]):
-        print(f"[WARNING] Skipping row with missing required fields (NAME, DOMAINS, SERVER_GROUP_IDS): {row}")
-        return None
-        
-    return {
-        "name": row.get("NAME", "").strip(),
-        "description": row.get("DESCRIPTION", "").strip(),
-        "enabled": str2bool(row.get("ENABLED", "true")),
-        "segment_group_name": row.get("SEGMENT_GROUP_ID", "").strip(),
-        "server_group_names": [name.strip() for name in row.get("SERVER_GROUP_IDS", "").split(",")],
-        "domain_names": [d.strip() for d in row.get("DOMAINS", "").split(",")],
-        "tcp_ports": parse_ports(row.get("TCP_PORTS", "")),
-        "udp_ports": parse_ports(row.get("UDP_PORTS", "")),
-        "double_encrypt": str2bool(row.get("DOUBLE_ENCRYPT", "false")),
-        "is_browser_access": str2bool(row.get("IS_BROWSER_ACCESS", "false")),
-        "is_pra": str2bool(row.get("IS_PRA", "false")),
-        "is_inspection": str2bool(row.get("IS_INSPECTION", "false")),
+    # Validation of group names happens in row_errors()/validate_rows().
+    # `row` comes from csv.reader and `fields` is SCHEMA with each column resolved to its position
+    # (None if absent), so fields are read by index; absent columns and short rows use the default.
+    row_len = len(row)
+    values = {
+        key: transform(row[i] if i is not None and i < row_len else default)
+        for key, i, default, transform in fields
     }
 
+    if not (values["name"] and any(values["domain_names"]) and any(values["server_group_names"])):
+        return None
+
+    domain_names = values["domain_names"]
+    tcp_ports = values.pop("tcp_ports")
+    udp_ports = values.pop("udp_ports")
+
+    # Everything derived from the row is computed here once, so creation only unpacks ready values.
+    # Child apps are (domain, port, protocol, app name) tuples: BA for every domain/TCP port pair,
+    # PRA only for the ports in PRA_PROTOCOLS. Each domain's "domain:" prefix is built once and
+    # reused for all of its ports.
+    is_browser_access = values.pop("is_browser_access")
+    is_pra = values.pop("is_pra")
+    ba_children = []
+    pra_children = []
+    for domain in domain_names:
+        dom_colon = domain + ":"
+        for port in tcp_ports:
+            if is_browser_access:
+                ba_children.append((domain, port, "HTTPS" if port in BA_HTTPS_PORTS else "HTTP", dom_colon + port))
+            protocol = is_pra and PRA_PROTOCOLS.get(port)
+            if protocol:
+                pra_children.append((domain, port, protocol, protocol + "-" + dom_colon + port))
+
+    # A domain or port listed twice in the row would produce child apps that ZPA rejects as duplicates
+    # after a wasted round-trip, so repeats are dropped here (keeping the first occurrence's order)
+    child_count = len(ba_children) + len(pra_children)
+    ba_children = list(dict.fromkeys(ba_children))
+    pra_children = list(dict.fromkeys(pra_children))
+    duplicate_children = child_count - len(ba_children) - len(pra_children)
+
+    values["tcp_port_range"] = [{"from": p, "to": p} for p in tcp_ports]
+    values["udp_port_range"] = [{"from": p, "to": p} for p in udp_ports]
+    values["ba_children"] = ba_children
+    values["pra_children"] = pra_children
+    values["duplicate_children"] = duplicate_children
+    return values
+
+def iter_rows(reader: Iterator[List[str]], stats: Counter, warn: bool = True) -> Iterator[Dict]:
+    """
+    Parses csv.reader rows lazily, so segment creation starts before the whole file has been read.
+    The header row is resolved to column positions once; rows are then read by index.
+    Counts the parsed rows in stats["rows"] as they stream through. Rows missing a required
+    field are skipped, with a warning unless `warn` is False (e.g. on a second pass over the file).
+    """
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip(): i for i, name in enumerate(header)}
+    fields = tuple((key, columns.get(column), default, transform) for key, column, default, transform in SCHEMA)
+    for row in reader:
+        parsed = parse_csv_row(row, fields)
+        if parsed:
+            stats["rows"] += 1
+            yield parsed
+        elif warn:
+            print(f"[WARNING] Skipping row with missing required fields (NAME, DOMAINS, SERVER_GROUP_IDS): {row}")
+
+def row_errors(row: Dict, server_groups_map, segment_groups_map) -> List[str]:
+    """Returns the reasons a parsed row cannot be created in this tenant (empty if it is valid)."""
+    errors = []
+    # Group maps are keyed by group_key(), so CSV names match regardless of case or stray spaces
+    missing_sgs = [sg for sg in row['server_group_names'] if group_key(sg) not in server_groups_map]
+    if missing_sgs:
+        errors.append(f"The following Server Groups were not found in the tenant: {', '.join(missing_sgs)}")
+    if group_key(row['segment_group_name']) not in segment_groups_map:
+        errors.append(f"The Segment Group '{row['segment_group_name']}' was not found in the tenant.")
+    return errors
+
+def validate_rows(rows: Iterable[Dict], server_groups_map, segment_groups_map) -> List[Tuple[str, List[str]]]:
+    """
+    Checks every row against the tenant's groups without making any API calls.
+    Rows are streamed and only the failures are kept, so the whole file can be checked
+    before the first segment is created.
+
+    Returns:
+        A list of (segment name, errors) for each invalid row.
+    """
+    invalid_rows = []
+    for row in rows:
+        errors = row_errors(row, server_groups_map, segment_groups_map)
+        if errors:
+            invalid_rows.append((row['name'], errors))
+    return invalid_rows
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yields successive lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def _add_child_app(job):
+    """Runs one queued BA/PRA child-app creation call and returns (app_type, app_name, error)."""
+    app_type, app_name, add_method, kwargs = job
+    try:
+        _, err = api_call(add_method, **kwargs)
+    except Exception as e:
+        # The legacy helper raises on HTTP failures; report it like an error result
+        err = e
+    return app_type, app_name, err
+
 # --- REMOVED the broken segment_exists function ---
 
-# --- REVISED 'create_and_configure_segments' ---
-def create_and_configure_segments(client, rows: List[Dict], server_groups_map, segment_groups_map, force: bool, existing_segment_names: set):
+def _process_row(client, row: Dict, server_groups_map, segment_groups_map, force: bool, existing_segment_names: FrozenSet[str], existing_fingerprints: FrozenSet[str]) -> Tuple[int, int, str]:
+    """
+    Creates one parent App Segment and its BA/PRA child applications.
+
+    Runs in a worker thread, so messages are printed into an in-memory buffer; the caller
+    writes the buffer out in one call once the row is finished, keeping each row's output in one block.
+
+    Returns:
+        (parent segments created, child apps configured, log text)
+    """
+    log = io.StringIO()
+    configured_apps = 0
+    name = row.get('name')
+    # CORRECTED: Check against the pre-fetched set of names
+    if not force and sys.intern(name) in existing_segment_names:
+        print(f"  ~ Skipping existing app segment: '{name}'", file=log)
+        return 0, 0, log.getvalue()
+
+    # Rows reaching this point have passed validate_rows, so every group lookup below succeeds
+    server_group_names = row['server_group_names']
+    segment_group_name = row['segment_group_name']
+
+    # 1. Create the Parent Application Segment
+    server_group_ids = [server_groups_map[group_key(sg_name)] for sg_name in server_group_names]
+    segment_group_id = segment_groups_map[group_key(segment_group_name)]
+
+    # A segment with another name may already publish exactly these apps; creating it again would only be rejected
+    if not force and segment_fingerprint(row['domain_names'], row['tcp_port_range'], row['udp_port_range'], segment_group_id) in existing_fingerprints:
+        print(f"  ~ Skipping '{name}': an existing segment already has the same domains, ports and segment group", file=log)
+        return 0, 0, log.getvalue()
+
+    print(f"  > Creating parent App Segment: '{name}'", file=log)
+    create_payload = {
+        "name": name, "description": row['description'], "enabled": row['enabled'],
+        "segment_group_id": segment_group_id, "server_group_ids": server_group_ids,
+        "domain_names": row['domain_names'],
+        "tcp_port_range": row['tcp_port_range'],
+        "udp_port_range": row['udp_port_range'],
+        "double_encrypt": row['double_encrypt'],
+        "app_protection_enabled": row['is_inspection']
+    }
+
+    parent_segment, _, err = api_call(client.application_segment.add_segment, **create_payload)
+    if err:
+        print(f"  ! FAILED to create parent segment '{name}': {err}", file=log)
+        return 0, 0, log.getvalue()
+    print(f"  ✓ Created parent segment '{name}' (ID: {parent_segment.id})", file=log)
+
+    # The child apps of a parent are independent calls, so they are queued here
+    # and sent concurrently below to overlap their round-trips
+    child_jobs = []
+    if row['duplicate_children']:
+        print(f"    ~ Skipping {row['duplicate_children']} duplicate BA/PRA app(s) repeated in the CSV row", file=log)
+
+    # 2. Add Browser Access (BA) Child Applications
+    if row['ba_children']:
+        print("    ...Configuring Browser Access applications...", file=log)
+        for domain, port, protocol, ba_name in row['ba_children']:
+            print(f"      - Adding BA app: '{ba_name}'", file=log)
+            child_jobs.append(("BA", ba_name, client.app_segments_ba.add_segment, dict(segment_id=parent_segment.id, name=ba_name, domain=domain, application_port=port, application_protocol=protocol, enabled=True)))
+
+    # 3. Add Privileged Remote Access (PRA) Child Applications
+    if row['pra_children']:
+        print("    ...Configuring Privileged Remote Access applications...", file=log)
+        for domain, port, protocol, pra_name in row['pra_children']:
+            print(f"      - Adding PRA app: '{pra_name}'", file=log)
+            child_jobs.append(("PRA", pra_name, client.app_segments_pra.add_segment, dict(segment_id=parent_segment.id, name=pra_name, domain=domain, application_port=port, application_protocol=protocol, enabled=True)))
+
+    # The pool is closed before the row is finished; results come back in queue order
+    if child_jobs:
+        with ThreadPoolExecutor(max_workers=CHILD_APP_WORKERS) as executor:
+            for app_type, app_name, app_err in executor.map(_add_child_app, child_jobs):
+                if app_err: print(f"      ! FAILED to add {app_type} app '{app_name}': {app_err}", file=log)
+                else: configured_apps += 1
+
+    return 1, configured_apps, log.getvalue()
+
+def read_max_concurrency() -> int:
+    """
+    Reads ZPA_MAX_CONCURRENCY (after main() has loaded the .env file), defaulting to DEFAULT_MAX_CONCURRENCY.
+    Exits with an error unless it is a positive integer.
+    """
+    value = os.getenv("ZPA_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY)).strip()
+    try:
+        max_concurrency = int(value)
+    except ValueError:
+        max_concurrency = 0
+    if max_concurrency < 1:
+        sys.exit(f"\n[ERROR] ZPA_MAX_CONCURRENCY must be a positive integer, got '{value}'.")
+    return max_concurrency
+
+def create_and_configure_segments(client, rows: Iterable[Dict], server_groups_map, segment_groups_map, force: bool, chunk_size: int = DEFAULT_CHUNK_SIZE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
     """
     Creates a parent App Segment, then adds BA/PRA child applications as needed.
+    Rows are processed concurrently, up to `max_concurrency` at a time. They are read and
+    queued `chunk_size` at a time, so memory stays flat however large the CSV is.
+    Unless `force` is set, the tenant's segments are fetched once up front, and rows matching
+    an existing segment by name or by fingerprint are skipped. If that listing fails, each chunk's
+    names are checked by server-side search instead.
+    A row that raises is reported as FAILED and counted; the remaining rows carry on.
+
+    Returns:
+        (parent segments created, child apps configured, failed rows)
     """
     created_count = 0
     configured_apps = 0
+    failed_rows = 0
 
-    for row in rows:
-        name = row.get('name')
-        # CORRECTED: Check against the pre-fetched set of names
-        if not force and name in existing_segment_names:
-            print(f"  ~ Skipping existing app segment: '{name}'")
-            continue
-
-        # --- Validation Step ---
-        # Check if all required server/segment groups exist before proceeding
-        server_group_names = row['server_group_names']
-        segment_group_name = row['segment_group_name']
-        missing_sgs = [sg for sg in server_group_names if sg not in server_groups_map]
-        if missing_sgs:
-            print(f"  ! SKIPPING '{name}': The following Server Groups were not found in the tenant: {', '.join(missing_sgs)}")
-            continue
-        if segment_group_name not in segment_groups_map:
-            print(f"  ! SKIPPING '{name}': The Segment Group '{segment_group_name}' was not found in the tenant.")
-            continue
-        # --- End Validation ---
-
-        # 1. Create the Parent Application Segment
-        print(f"  > Creating parent App Segment: '{name}'")
-        server_group_ids = [server_groups_map[sg_name] for sg_name in server_group_names]
-        segment_group_id = segment_groups_map[segment_group_name]
-        
-        create_payload = {
-            "name": name, "description": row['description'], "enabled": row['enabled'],
-            "segment_group_id": segment_group_id, "server_group_ids": server_group_ids,
-            "domain_names": row['domain_names'],
-            "tcp_port_range": [{"from": p, "to": p} for p in row['tcp_ports']],
-            "udp_port_range": [{"from": p, "to": p} for p in row['udp_ports']],
-            "double_encrypt": row['double_encrypt'],
-            "app_protection_enabled": row['is_inspection']
-        }
-        
-        parent_segment, _, err = client.application_segment.add_segment(**create_payload)
-        if err:
-            print(f"  ! FAILED to create parent segment '{name}': {err}")
-            continue
-        created_count += 1
-        print(f"  ✓ Created parent segment '{name}' (ID: {parent_segment.id})")
-
-        # 2. Add Browser Access (BA) Child Applications
-        if row['is_browser_access']:
-            print("    ...Configuring Browser Access applications...")
-            for domain in row['domain_names']:
-                for port in row['tcp_ports']:
-                    protocol = "HTTPS" if port in ["443", "8443"] else "HTTP"
-                    ba_name = f"{domain}:{port}"
-                    print(f"      - Adding BA app: '{ba_name}'")
-                    _, ba_err = client.app_segments_ba.add_segment(segment_id=parent_segment.id, name=ba_name, domain=domain, application_port=port, application_protocol=protocol, enabled=True)
-                    if ba_err: print(f"      ! FAILED to add BA app '{ba_name}': {ba_err}")
-                    else: configured_apps += 1
-
-        # 3. Add Privileged Remote Access (PRA) Child Applications
-        if row['is_pra']:
-            print("    ...Configuring Privileged Remote Access applications...")
-            for domain in row['domain_names']:
-                for port in row['tcp_ports']:
-                    protocol = "SSH" if port == "22" else "RDP" if port == "3389" else None
-                    if not protocol: continue
-                    pra_name = f"{protocol}-{domain}:{port}"
-                    print(f"      - Adding PRA app: '{pra_name}'")
-                    _, pra_err = client.app_segments_pra.add_segment(segment_id=parent_segment.id, name=pra_name, domain=domain, application_port=port, application_protocol=protocol, enabled=True)
-                    if pra_err: print(f"      ! FAILED to add PRA app '{pra_name}': {pra_err}")
-                    else: configured_apps += 1
-
-    return created_count, configured_apps
+    all_segment_names, existing_fingerprints = (frozenset(), frozenset()) if force else fetch_existing_segments(client)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        try:
+            for chunk in chunked(rows, chunk_size):
+                existing_segment_names = all_segment_names
+                if existing_segment_names is None:
+                    existing_segment_names = search_existing_segment_names(client, (row['name'] for row in chunk), executor)
+                    if existing_segment_names is None:
+                        print("[WARNING] Segment name search failed; this chunk's names can't be checked. The --force flag will be required to avoid errors.")
+                        existing_segment_names = frozenset()
+                futures = {
+                    executor.submit(_process_row, client, row, server_groups_map, segment_groups_map, force, existing_segment_names, existing_fingerprints): row['name']
+                    for row in chunk
+                }
+                # Counters are aggregated and each row's log block is written from this thread as rows finish;
+                # the chunk is drained before the next one is read
+                for future in as_completed(futures):
+                    try:
+                        created, configured, log_text = future.result()
+                    except Exception as e:
+                        # The row's buffered log is lost with the exception, so report the row by name
+                        failed_rows += 1
+                        print(f"  ! FAILED to import app segment '{futures[future]}': {e}")
+                        continue
+                    created_count += created
+                    configured_apps += configured
+                    sys.stdout.write(log_text)
+        except BaseException as e:
+            # Drop the queued rows; leaving the with block then only waits for the rows already in progress
+            if isinstance(e, KeyboardInterrupt):
+                print("\n[WARNING] Interrupted: cancelling queued rows and waiting for the ones in progress...")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return created_count, configured_apps, failed_rows
 
 def main():
     print("--- ZPA Bulk App Segment Import (v6 - Corrected) ---")
@@ -135,44 +423,68 @@ def main():
     config = {"client_id": os.getenv("ZPA_CLIENT_ID"), "client_secret": os.getenv("ZPA_CLIENT_SECRET"), "customer_id": os.getenv("ZPA_CUSTOMER_ID"), "cloud": os.getenv("ZPA_CLOUD")}
     if not all(config.values()):
         sys.exit("\n[ERROR] Missing required environment variables.")
+    # Checked up front so a bad value fails before any API call is made
+    max_concurrency = read_max_concurrency()
 
     with LegacyZPAClient(config) as parent_client:
-        legacy_client = parent_client.zpa_legacy_client
-        server_groups = list_server_groups(legacy_client)
-        segment_groups = list_segment_groups(legacy_client)
-        if not server_groups or not segment_groups:
-            sys.exit("[ERROR] No server or segment groups found.")
-        print("[INFO] Fetched server and segment group details successfully.")
-
-        # --- NEW: Pre-fetch existing segment names for efficiency ---
-        print("[INFO] Fetching names of all existing application segments...")
-        all_existing_segments, _, err = legacy_client.application_segment.list_segments() # Corrected call
-        if err:
-            print(f"[WARNING] Could not fetch existing segments: {err}. The --force flag will be required to avoid errors.")
-            existing_segment_names = set()
-        else:
-            existing_segment_names = {segment.name for segment in all_existing_segments}
-            print(f"  > Found {len(existing_segment_names)} existing segments.")
+        try:
+            legacy_client = parent_client.zpa_legacy_client
+            # Reuse pooled TCP/TLS connections across all API calls instead of reconnecting per request
+            if not mount_connection_pool(parent_client, pool_size=HTTP_POOL_SIZE):
+                print("[INFO] No SDK HTTP session found to tune; using the SDK's default connection handling.")
+            server_groups = list_server_groups(legacy_client)
+            segment_groups = list_segment_groups(legacy_client)
+            if not server_groups or not segment_groups:
+                sys.exit("[ERROR] No server or segment groups found.")
+            print("[INFO] Fetched server and segment group details successfully.")
 
-        parser = argparse.ArgumentParser(description="Create and configure ZPA app segments.")
-        parser.add_argument("--csv", required=True, help="Path to CSV file.")
-        parser.add_argument("--force", action="store_true", help="Force creation even if segment name exists.")
-        args = parser.parse_args()
+            parser = argparse.ArgumentParser(description="Create and configure ZPA app segments.")
+            parser.add_argument("--csv", required=True, help="Path to CSV file.")
+            parser.add_argument("--force", action="store_true", help="Force creation even if segment name exists.")
+            parser.add_argument("--partial", action="store_true", help="Import the valid rows even if other rows fail validation.")
+            parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"Rows to read and queue at a time (default: {DEFAULT_CHUNK_SIZE}).")
+            args = parser.parse_args()
+            if args.chunk_size < 1:
+                parser.error("--chunk-size must be at least 1.")
 
-        try:
-            with open(args.csv, newline="", encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                parsed_rows = [parsed for row in reader if (parsed := parse_csv_row(row))]
-        except FileNotFoundError:
-            sys.exit(f"\n[ERROR] CSV file '{args.csv}' not found.")
-
-        if not parsed_rows:
-            sys.exit("\n[INFO] No valid rows found in CSV.")
-            
-        print(f"\n[INFO] Found {len(parsed_rows)} valid app segments to process.")
-
-        created, configured = create_and_configure_segments(legacy_client, parsed_rows, server_groups, segment_groups, args.force, existing_segment_names)
-        print(f"\n[INFO] Process complete. Parent Segments Created: {created}, BA/PRA Apps Configured: {configured}.")
+            try:
+                csv_file = open(args.csv, newline="", encoding='utf-8')
+            except FileNotFoundError:
+                sys.exit(f"\n[ERROR] CSV file '{args.csv}' not found.")
+
+            stats = Counter()
+            with csv_file:
+                # Pass 1: validate every row before anything is created, so a bad group name
+                # can't leave the import half-applied
+                print(f"\n[INFO] Validating app segments in '{args.csv}'...")
+                invalid_rows = validate_rows(iter_rows(csv.reader(csv_file), stats), server_groups, segment_groups)
+                if not stats["rows"]:
+                    sys.exit("\n[INFO] No valid rows found in CSV.")
+                if invalid_rows:
+                    print(f"\n[ERROR] {len(invalid_rows)} row(s) failed validation:")
+                    for name, errors in invalid_rows:
+                        for error in errors:
+                            print(f"  ! '{name}': {error}")
+                    if not args.partial:
+                        sys.exit("\n[ERROR] No app segments were created. Fix the rows above or rerun with --partial to import only the valid rows.")
+                    print(f"[WARNING] --partial set: skipping {len(invalid_rows)} invalid row(s).")
+
+                # Pass 2: stream the file again and hand the valid rows to the workers as they are read
+                print(f"\n[INFO] Processing app segments from '{args.csv}'...")
+                csv_file.seek(0)
+                rows = (
+                    row for row in iter_rows(csv.reader(csv_file), Counter(), warn=False)
+                    if not row_errors(row, server_groups, segment_groups)
+                )
+                created, configured, failed = create_and_configure_segments(legacy_client, rows, server_groups, segment_groups, args.force, args.chunk_size, max_concurrency)
+
+            valid_rows = stats["rows"] - len(invalid_rows)
+            print(f"\n[INFO] Process complete. Valid Rows: {valid_rows}, Parent Segments Created: {created}, BA/PRA Apps Configured: {configured}, Failed Rows: {failed}.")
+        except KeyboardInterrupt:
+            sys.exit("\n[ERROR] Import interrupted. Segments created before the interruption were kept; rerun to import the rest.")
+        finally:
+            # Release the pooled connections now rather than at garbage collection
+            close_connection_pool(parent_client)
 
 if __name__ == "__main__":
     main()
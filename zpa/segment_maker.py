@@ -1,73 +1,104 @@
 import os
 import csv
 import sys
-from collections import defaultdict
+from functools import lru_cache
+from collections import Counter, defaultdict
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
 from zscaler.oneapi_client import LegacyZPAClient
+from _http import close_connection_pool
+from _segments import list_all_segments
 
+@lru_cache(maxsize=256)
 def str2bool(value: str) -> bool:
     """
     Converts a string value to a boolean.
     - This function checks if the input string represents a truthy value (e.g., "1", "true", "yes", "y").
     - Zscaler uses boolean flags (e.g., enabled/disabled), making this conversion helpful for validating CSV inputs.
+    - Memoized, since CSV flag columns repeat the same few values on every row.
     """
     return str(value).lower() in ("1", "true", "yes", "y")
 
-def list_server_groups(client) -> Dict[str, str]:
+def group_key(name: str) -> str:
+    """
+    Normalizes a group name for lookups.
+    - Strips surrounding whitespace and casefolds, so CSV values match ZPA names regardless of case.
+    """
+    return name.strip().casefold()
+
+def list_server_groups(client) -> Tuple[Dict[str, str], Dict[str, str]]:
     """
     Lists all server groups in ZPA and maps their names to IDs.
     - Server groups represent network resources that application segments connect to.
     - The function uses the Zscaler API client to fetch server group details.
-      * Returns a dictionary where keys are server group names and values are their IDs for easy lookup.
+      * Returns two dictionaries keyed by normalized (`group_key`) server group names: one maps to the IDs
+        for lookups, the other to the names as written in ZPA for messages shown to the user.
     """
     groups, _, err = client.server_groups.list_groups()
     if err:
         print(f"[ERROR] Failed to fetch server groups: {err}")
-        return {}
+        return {}, {}
 
-    return {group.name: group.id for group in groups}
+    return {group_key(group.name): group.id for group in groups}, {group_key(group.name): group.name for group in groups}
 
 def list_segment_groups(client) -> Dict[str, str]:
     """
     Lists all segment groups in ZPA and maps their names to IDs.
     - Segment groups are used to organize application segments logically.
     - This function retrieves segment group information using the ZPA API.
-      * Returns a dictionary where keys are segment group names and values are their IDs.
+      * Returns two dictionaries keyed by normalized (`group_key`) segment group names: one maps to the IDs,
+        the other to the names as written in ZPA.
     """
     groups, _, err = client.segment_groups.list_groups()
     if err:
         print(f"[ERROR] Failed to fetch segment groups: {err}")
-        return {}
+        return {}, {}
+
+    return {group_key(group.name): group.id for group in groups}, {group_key(group.name): group.name for group in groups}
 
-    return {group.name: group.id for group in groups}
+@lru_cache(maxsize=256)
+def split_ports(port_string: str) -> Tuple[str, ...]:
+    """
+    Splits a comma-separated port string into a tuple of trimmed, non-empty ports.
+    - Memoized, since the same port lists tend to repeat across rows; the tuple keeps the cached value immutable.
+    """
+    ports = (port_string or "").strip().split(",")
+    return tuple(p.strip() for p in ports if p.strip())
 
 def parse_ports(port_string: str) -> List[Dict]:
     """
     Converts a comma-separated port string into a list of port range dictionaries.
     - Example: Input `'8000,8001'` → Output `[{'from': '8000', 'to': '8000'}, {'from': '8001', 'to': '8001'}]`
     - This is used to define TCP/UDP port ranges for ZPA application segments.
+    - The dictionaries are built fresh for each row, as they become part of the API payload.
     """
-    ports = (port_string or "").strip().split(",")
-    return [{"from": p.strip(), "to": p.strip()} for p in ports if p.strip()]
+    return [{"from": p, "to": p} for p in split_ports(port_string)]
 
-def parse_csv_row(row: Dict, server_groups: Dict[str, str], segment_groups: Dict[str, str]) -> Optional[Dict]:
+def parse_csv_row(row: List[str], columns: Dict[str, int], server_groups: Dict[str, str], segment_groups: Dict[str, str], server_group_labels: Dict[str, str], segment_group_labels: Dict[str, str]) -> Optional[Dict]:
     """
     Parses and validates a row from a CSV file to build a payload for ZPA app segment creation.
+    - `row` comes from csv.reader; `columns` maps each header name to its position, resolved once per file.
+      * Absent columns and short rows read as empty strings (or the field's default).
     - Validates required fields (NAME, SEGMENT_GROUP_ID, etc.) and checks if server group/segment group names exist in ZPA.
+      * `server_group_labels`/`segment_group_labels` map group keys back to the names as written in ZPA, so suggestions can be copied into the CSV.
     - Returns a dictionary representing the app segment, or None if the row is invalid.
     - Example output: {"name": ..., "server_group_ids": [...], "domain_names": [...], ...}
     """
-    name = row.get("NAME", "").strip()
-    segment_group_name = row.get("SEGMENT_GROUP_ID", "").strip()
-    server_group_names = [name.strip() for name in row.get("SERVER_GROUP_IDS", "").split(",") if name.strip()]
-    domain_names = [domain.strip() for domain in row.get("DOMAINS", "").split(",") if domain.strip()]
+    row_len = len(row)
+    def field(column: str, default: str = "") -> str:
+        i = columns.get(column)
+        return row[i] if i is not None and i < row_len else default
+
+    name = field("NAME").strip()
+    segment_group_name = field("SEGMENT_GROUP_ID").strip()
+    server_group_names = [name.strip() for name in field("SERVER_GROUP_IDS").split(",") if name.strip()]
+    domain_names = [domain.strip() for domain in field("DOMAINS").split(",") if domain.strip()]
 
     errors = []  # Keep track of validation errors
     if not name:
         errors.append("NAME is required.")
-    if not segment_group_name or segment_group_name not in segment_groups:
-        suggested = list(segment_groups.keys())[0] if segment_groups else "Unknown"
+    if not segment_group_name or group_key(segment_group_name) not in segment_groups:
+        suggested = segment_group_labels[next(iter(segment_groups))] if segment_groups else "Unknown"
         errors.append(f"SEGMENT_GROUP_ID missing or invalid. Suggested: '{suggested}'")
     if not domain_names:
         errors.append("DOMAINS is required (e.g., IP addresses or FQDNs).")
@@ -75,11 +106,12 @@ def parse_csv_row(row: Dict, server_groups: Dict[str, str], segment_groups: Dict
     # Validate server group names and map them to IDs
     server_group_ids = []
     for sg_name in server_group_names:
-        if sg_name not in server_groups:
-            suggested = list(server_groups.keys())[0] if server_groups else "Unknown"
+        sg_id = server_groups.get(group_key(sg_name))
+        if sg_id is None:
+            suggested = server_group_labels[next(iter(server_groups))] if server_groups else "Unknown"
             errors.append(f"Server Group '{sg_name}' is invalid. Suggested: '{suggested}'")
         else:
-            server_group_ids.append(server_groups[sg_name])
+            server_group_ids.append(sg_id)
     
     if not server_group_ids:
         errors.append("SERVER_GROUP_IDS are all invalid or missing.")
@@ -94,45 +126,83 @@ def parse_csv_row(row: Dict, server_groups: Dict[str, str], segment_groups: Dict
     # Construct the validated payload
     return {
         "name": name,
-        "description": row.get("DESCRIPTION", "").strip(),
-        "enabled": str2bool(row.get("ENABLED", "true")),
-        "segment_group_id": segment_groups.get(segment_group_name),
+        "description": field("DESCRIPTION").strip(),
+        "enabled": str2bool(field("ENABLED", "true")),
+        "segment_group_id": segment_groups.get(group_key(segment_group_name)),
         "server_group_ids": server_group_ids,
         "domain_names": domain_names,
-        "tcp_port_range": parse_ports(row.get("TCP_PORTS", "")),
-        "udp_port_range": parse_ports(row.get("UDP_PORTS", "")),
-        "double_encrypt": str2bool(row.get("DOUBLE_ENCRYPT", "false")),
+        "tcp_port_range": parse_ports(field("TCP_PORTS")),
+        "udp_port_range": parse_ports(field("UDP_PORTS")),
+        "double_encrypt": str2bool(field("DOUBLE_ENCRYPT", "false")),
     }
 
-def segment_exists(client, domain: str, ports: List[Dict]) -> bool:
+def iter_rows(reader: Iterator[List[str]], server_groups: Dict[str, str], segment_groups: Dict[str, str], server_group_labels: Dict[str, str], segment_group_labels: Dict[str, str], stats: Counter) -> Iterator[Dict]:
     """
-    Checks if an application segment already exists in ZPA based on domain and port configuration.
-    - Prevents duplicate application segment creation if an identical configuration already exists.
-    - Combines ZPA's list operation and payload comparison for this check.
+    Parses and validates csv.reader rows lazily, so segment creation starts before the whole file has been read.
+    - The header row is resolved to column positions once; each row is then read by index.
+    - Invalid rows are reported by `parse_csv_row` and skipped.
+    - Tallies the valid rows in stats["segments"] and their domain/port combinations in stats["applications"].
     """
-    segments, _, err = client.application_segment.list_segments()
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {column.strip(): i for i, column in enumerate(header)}
+    for row in reader:
+        parsed_row = parse_csv_row(row, columns, server_groups, segment_groups, server_group_labels, segment_group_labels)
+        if not parsed_row:
+            continue
+        stats["segments"] += 1
+        num_domains = len(parsed_row["domain_names"])
+        num_ports = len(parsed_row["tcp_port_range"]) + len(parsed_row["udp_port_range"])
+        if num_domains > 0 and num_ports > 0:
+            stats["applications"] += num_domains * num_ports
+        yield parsed_row
+
+def port_key(ports: List[Dict]) -> Tuple:
+    """
+    Converts a list of port range dictionaries into a hashable ((from, to), ...) tuple.
+    - Order is kept, matching a direct comparison of the `tcp_port_range` lists.
+    """
+    return tuple((port["from"], port["to"]) for port in ports or ())
+
+def segment_key(domain: str, ports: List[Dict]) -> Tuple:
+    """
+    Builds the (domain, ports) key used to detect duplicate app segments.
+    """
+    return domain, port_key(ports)
+
+def fetch_existing_segment_keys(client) -> Set[Tuple]:
+    """
+    Fetches all application segments once and indexes every (domain, TCP ports) combination they cover.
+    - Replaces a full `list_segments()` call per CSV row with a single listing and O(1) lookups.
+    - Pages through the whole listing, since an unpaged `list_segments()` only returns the first page.
+    - Returns an empty set if the API call fails, so no segment is treated as existing.
+    """
+    segments, _, err = list_all_segments(client)
     if err:
         print(f"[WARNING] Could not check for existing segments: {err}")
-        return False  # Default to False if an API error occurs.
+        return set()  # Default to "nothing exists" if an API error occurs.
 
-    # Compare each existing segment's domains and ports with the provided domain and ports
+    existing_keys = set()
     for segment in segments:
-        if domain in segment.domain_names and segment.tcp_port_range == ports:
-            return True
-    return False
+        ports = port_key(segment.tcp_port_range)
+        existing_keys.update((domain, ports) for domain in segment.domain_names)
+    return existing_keys
 
-def create_app_segments(client, rows: List[Dict], force_creation: bool):
+def create_app_segments(client, rows: Iterable[Dict], force_creation: bool):
     """
     Creates application segments in ZPA based on validated rows.
     - Verifies if the segment already exists before attempting creation (unless `force_creation` is enabled).
     - Uses ZPA API's `add_segment` method for app segment creation.
     """
     created_count = 0  # Count successfully created app segments
+    # Existing segments are fetched once up front rather than once per row
+    existing_keys = set() if force_creation else fetch_existing_segment_keys(client)
     for row in rows:
         domain = row.get("domain_names")[0]  # Use the first domain name in the row
         ports = row.get("tcp_port_range")
 
-        if not force_creation and segment_exists(client, domain, ports):
+        if not force_creation and segment_key(domain, ports) in existing_keys:
             print(f"  ~ Skipping existing app segment for domain '{domain}' and ports '{ports}'")
             continue
 
@@ -142,6 +212,9 @@ def create_app_segments(client, rows: List[Dict], force_creation: bool):
         else:
             created_count += 1
             print(f"  ✓ Created app segment '{row.get('name')}'")
+            # Index the new segment too, so later rows with the same domain and ports are still skipped
+            for created_domain in row.get("domain_names"):
+                existing_keys.add(segment_key(created_domain, ports))
     return created_count
 
 def main():
@@ -171,57 +244,52 @@ def main():
 
     # Initialize ZPA Client
     with LegacyZPAClient(config) as parent_client:
-        legacy_client = parent_client.zpa_legacy_client
-        server_groups = list_server_groups(legacy_client)
-        segment_groups = list_segment_groups(legacy_client)
+        try:
+            legacy_client = parent_client.zpa_legacy_client
+            server_groups, server_group_labels = list_server_groups(legacy_client)
+            segment_groups, segment_group_labels = list_segment_groups(legacy_client)
 
-        if not server_groups:
-            print("[ERROR] No server groups found. Unable to proceed.")
-            sys.exit(1)
-        if not segment_groups:
-            print("[ERROR] No segment groups found. Unable to proceed.")
-            sys.exit(1)
+            if not server_groups:
+                print("[ERROR] No server groups found. Unable to proceed.")
+                sys.exit(1)
+            if not segment_groups:
+                print("[ERROR] No segment groups found. Unable to proceed.")
+                sys.exit(1)
 
-        print("[INFO] Fetched server and segment group details successfully.")
+            print("[INFO] Fetched server and segment group details successfully.")
 
-        # Parse arguments for CSV file input and force flag
-        import argparse
-        parser = argparse.ArgumentParser(description="Validate and create ZPA app segments via SDK")
-        parser.add_argument("--csv", required=True, help="Path to CSV file with app segment details")
-        parser.add_argument("--force", action="store_true", help="Force creation even if an app segment with the same domain and ports exists")
-        args = parser.parse_args()
+            # Parse arguments for CSV file input and force flag
+            import argparse
+            parser = argparse.ArgumentParser(description="Validate and create ZPA app segments via SDK")
+            parser.add_argument("--csv", required=True, help="Path to CSV file with app segment details")
+            parser.add_argument("--force", action="store_true", help="Force creation even if an app segment with the same domain and ports exists")
+            args = parser.parse_args()
 
-        try:
-            with open(args.csv, newline="") as f:
-                reader = csv.DictReader(f)
-                rows = []
-                for row in reader:
-                    parsed_row = parse_csv_row(row, server_groups, segment_groups)
-                    if parsed_row:
-                        rows.append(parsed_row)
-        except FileNotFoundError:
-            print(f"\n[ERROR] CSV file '{args.csv}' not found.", file=sys.stderr)
-            sys.exit(1)
+            try:
+                csv_file = open(args.csv, newline="")
+            except FileNotFoundError:
+                print(f"\n[ERROR] CSV file '{args.csv}' not found.", file=sys.stderr)
+                sys.exit(1)
 
-        if not rows:
-            print("\n[INFO] No valid rows found in the CSV. Exiting.")
-            sys.exit(0)
-            
-        # Calculate the total number of applications (domain/IP + port combinations)
-        application_count = 0
-        for row in rows:
-            num_domains = len(row.get("domain_names", []))
-            num_ports = len(row.get("tcp_port_range", [])) + len(row.get("udp_port_range", []))
-            if num_domains > 0 and num_ports > 0:
-                application_count += num_domains * num_ports
-
-        segment_count = len(rows)  # Valid rows to create app segments
-
-        print(f"\n[INFO] Found {application_count} total applications defined across {segment_count} app segments to be created.")
-
-        # Create app segments directly
-        created_count = create_app_segments(legacy_client, rows, args.force)
-        print(f"\n[INFO] Successfully created {created_count} app segments.")
+            # Rows are validated and created as they are read, so the CSV is never held in memory;
+            # the application/segment totals are tallied on the way through
+            stats = Counter()
+            with csv_file:
+                rows = iter_rows(csv.reader(csv_file), server_groups, segment_groups, server_group_labels, segment_group_labels, stats)
+                created_count = create_app_segments(legacy_client, rows, args.force)
+
+            if not stats["segments"]:
+                print("\n[INFO] No valid rows found in the CSV. Exiting.")
+                sys.exit(0)
+
+            print(f"\n[INFO] Found {stats['applications']} total applications defined across {stats['segments']} valid app segments.")
+            print(f"\n[INFO] Successfully created {created_count} app segments.")
+        except KeyboardInterrupt:
+            print("\n[ERROR] Interrupted. App segments created before the interruption were kept.", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            # Release the SDK's connections now rather than at garbage collection
+            close_connection_pool(parent_client)
         
 if __name__ == "__main__":
     main()
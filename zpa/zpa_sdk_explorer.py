@@ -2,10 +2,26 @@
 
 import os
 import sys
+import time
 import code
 from dotenv import load_dotenv
 from zscaler.oneapi_client import LegacyZPAClient
 
+# IPython adds history and tab completion to the shell; it's optional and we fall back to code.interact
+try:
+    from IPython import embed
+except ImportError:
+    embed = None
+
+# How long the shell's list_* helpers reuse a previous response, in seconds
+SHELL_CACHE_TTL_S = 60
+
+def env_bool(key, default=False):
+    """
+    Reads a boolean flag from the environment; "1", "true" and "yes" (any case) count as True.
+    """
+    return os.environ.get(key, str(default)).strip().lower() in ("1", "true", "yes")
+
 def initialize_zpa_client(config):
     """
     Initializes the Legacy ZPA Client and returns the client.zpa object for interaction.
@@ -25,6 +41,71 @@ def initialize_zpa_client(config):
         print(f"[ERROR] Failed to initialize Legacy ZPA Client: {e}", file=sys.stderr)
         sys.exit(1)
 
+def make_cached_helpers(client, ttl_s: int = SHELL_CACHE_TTL_S):
+    """
+    Builds list helpers for the shell that reuse responses younger than `ttl_s` seconds,
+    so repeating a listing while exploring doesn't hit the API again.
+
+    The SDK creates a new service object on every attribute access (client.server_groups, ...),
+    so its methods can't be wrapped in place; plain functions are exposed instead. They return
+    the same (result, response, error) tuples as the SDK, and errors are never cached.
+    """
+    cache = {}
+
+    def cached_call(key, fetch):
+        entry = cache.get(key)
+        if entry and time.monotonic() - entry[0] < ttl_s:
+            return entry[1]
+        result = fetch()
+        if not result[-1]:
+            cache[key] = (time.monotonic(), result)
+        return result
+
+    def list_segments(query_params=None):
+        """client.application_segment.list_segments(), cached per query_params."""
+        key = ("segments", repr(sorted((query_params or {}).items())))
+        return cached_call(key, lambda: client.application_segment.list_segments(query_params=query_params))
+
+    def list_server_groups():
+        """client.server_groups.list_groups(), cached."""
+        return cached_call("server_groups", client.server_groups.list_groups)
+
+    def list_segment_groups():
+        """client.segment_groups.list_groups(), cached."""
+        return cached_call("segment_groups", client.segment_groups.list_groups)
+
+    def invalidate_cache():
+        """Drops every cached response, so the next call fetches fresh data."""
+        cache.clear()
+
+    return {
+        "list_segments": list_segments,
+        "list_server_groups": list_server_groups,
+        "list_segment_groups": list_segment_groups,
+        "invalidate_cache": invalidate_cache,
+    }
+
+def prefetch_groups(helpers):
+    """
+    Fetches the server and segment groups once through the cached helpers, so they are ready
+    in the shell (and in the cache) without re-querying the API.
+    A failed fetch (an error result or a raised exception) is reported and left as None,
+    so the shell always opens.
+    """
+    namespace = {}
+    for name, list_groups in (("server_groups", helpers["list_server_groups"]), ("segment_groups", helpers["list_segment_groups"])):
+        try:
+            groups, _, err = list_groups()
+        except Exception as e:
+            groups, err = None, e
+        if err:
+            print(f"[WARNING] Could not prefetch {name.replace('_', ' ')}: {err}", file=sys.stderr)
+            groups = None
+        else:
+            print(f"[INFO] Prefetched {len(groups)} {name.replace('_', ' ')}.")
+        namespace[name] = groups
+    return namespace
+
 def main():
     """
     Main function for loading configuration, initializing the client, and launching the interactive shell.
@@ -40,8 +121,8 @@ def main():
         "cloud": os.getenv("ZPA_CLOUD"),
         "microtenantId": os.getenv("ZPA_MICROTENANT_ID"), # Will be None if not set, which is fine
         "logging": {
-            "enabled": bool(os.getenv("ZPA_LOG_ENABLED", "False").lower() == "true"),
-            "verbose": bool(os.getenv("ZPA_LOG_VERBOSE", "False").lower() == "true"),
+            "enabled": env_bool("ZPA_LOG_ENABLED"),
+            "verbose": env_bool("ZPA_LOG_VERBOSE"),
         },
     }
 
@@ -58,15 +139,24 @@ def main():
     # Initialize the ZPA SDK client
     client = initialize_zpa_client(config)
 
+    # Server and segment groups are needed in most sessions, so they are fetched up front
+    helpers = make_cached_helpers(client)
+    namespace = {"client": client, **helpers, **prefetch_groups(helpers)}
+
     # Launch the interactive Python shell
     print("\n[INFO] Python shell initialized. Interact with the SDK via the 'client' object.")
+    print("[INFO] Prefetched lists are available as 'server_groups' and 'segment_groups'.")
+    print(f"[INFO] list_segments(), list_server_groups() and list_segment_groups() cache results for {SHELL_CACHE_TTL_S}s; invalidate_cache() clears them.")
     print("[TIP] Example commands:")
     print("  - List App Segments: segments = client.application_segment.list_segments()")
     print("  - List Server Groups: groups = client.server_groups.list_groups()")
     
     
-    # Pass the client object into the local scope of the interactive shell
-    code.interact(local={'client': client})
+    # Pass the client object (and the prefetched lists) into the local scope of the interactive shell
+    if embed is not None:
+        embed(user_ns=namespace)
+    else:
+        code.interact(local=namespace)
 
 if __name__ == "__main__":
     main()